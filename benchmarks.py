@@ -0,0 +1,352 @@
+"""Benchmarks for the scanner, parser and interpreter.  Run "python3 benchmarks.py NAME ...", where each NAME is
+a key of "benchmarks" below; with no arguments, every benchmark is run."""
+from untyped_lambda import *
+from time import perf_counter
+from sys import argv
+import random
+import unicodedata
+import tempfile
+import tracemalloc
+import os
+
+def time_call(function, *args):
+	"""Returns the pair (seconds taken, result) for the call function(*args)."""
+	start = perf_counter()
+	result = function(*args)
+	return perf_counter() - start, result
+
+def scan_scaling(max_size = 10 ** 7):
+	"""Scans inputs of 1 KB to "max_size" bytes with "Lambda_Calculus.scanner"; the time per character should
+	not grow with the size of the input."""
+	snippet = "plus 12 (f x) := abc "
+	dfa = Lambda_Calculus.scanner
+	compiled = Lambda_Calculus.table_scanner
+	print("Scanning (time per character in ns)")
+	print("size".rjust(10), "DFA.scan".rjust(12), "compiled".rjust(12), "bytes".rjust(12))
+	size = 1000
+	while size <= max_size:
+		string = (snippet * (size // len(snippet) + 1))[:size]
+		data = string.encode("latin-1")
+		dfa_time, _ = time_call(dfa.scan, string)
+		compiled_time, _ = time_call(compiled.scan, string)
+		bytes_time, _ = time_call(compiled.scan, data)
+		print(str(size).rjust(10), *[("%.1f" % (t / size * 1e9)).rjust(12) for t in [dfa_time, compiled_time, bytes_time]])
+		size *= 10
+
+def minimization():
+	"""Reports the number of states of the scanner of "Lambda_Calculus" before and after minimization."""
+	dfa = Lambda_Calculus.build_scanner(Lambda_Calculus.alphabet, Lambda_Calculus.digits, Lambda_Calculus.special_symbols, minimize = False)
+	seconds, minimal = time_call(dfa.minimize)
+	print("Lambda_Calculus scanner: %d states before minimization, %d after (%.1f ms)" % (len(dfa.states), len(minimal.states), seconds * 1000))
+
+def keyword_scanner_nfa(count, seed = 1):
+	"""Returns an NFA recognizing "count" random keywords, each its own token type, and identifiers."""
+	rng = random.Random(seed)
+	keywords = set()
+	while len(keywords) < count:
+		keywords.add("".join(rng.choice(Lambda_Calculus.alphabet) for _ in range(rng.randint(3, 10))))
+	keyword_nfas = [NFA(set(keyword), char_type = keyword, token_type = keyword) for keyword in sorted(keywords)]
+	letter_nfas = [NFA({char}, char_type = char) for char in Lambda_Calculus.alphabet]
+	identifiers = NFA.close_NFA(NFA.join_NFAs(letter_nfas), new_token_type = "identifier")
+	return NFA.join_NFAs(keyword_nfas + [identifiers])
+
+def subset_construction(count = 1000):
+	"""Times the conversion to a DFA of a scanner for "count" keywords and identifiers."""
+	nfa = keyword_scanner_nfa(count)
+	seconds, dfa = time_call(nfa.convert)
+	print("%d-keyword scanner: %d NFA states converted to %d DFA states in %.2f s" % (count, len(Bitset_NFA(nfa).states), len(dfa.states), seconds))
+
+def unicode_ranges(predicate):
+	"""Returns the list of maximal "Char_Range"s of characters satisfying "predicate"."""
+	ranges = []
+	first = None
+	for code_point in range(0x110000 + 1):
+		if code_point < 0x110000 and predicate(chr(code_point)):
+			if first == None:
+				first = code_point
+		elif first != None:
+			ranges.append(Char_Range(chr(first), chr(code_point - 1)))
+			first = None
+	return ranges
+
+def unicode_scanner():
+	"""Times the construction of a scanner for identifiers over all Unicode letters, numbers and spaces."""
+	letters = unicode_ranges(lambda char: unicodedata.category(char).startswith("L"))
+	digits = unicode_ranges(lambda char: unicodedata.category(char) == "Nd")
+	start = perf_counter()
+	identifiers = NFA.close_NFA(NFA(set(letters), char_type = [set(letters)]), new_token_type = "identifier")
+	numbers = NFA.close_NFA(NFA(set(digits), char_type = [set(digits)]), new_token_type = "number")
+	space = NFA({" "}, char_type = " ", token_type = "space")
+	dfa = NFA.join_NFAs([identifiers, numbers, space]).convert().minimize()
+	compiled = dfa.compile()
+	seconds = perf_counter() - start
+	transitions = sum(len(state.transition) for state in dfa.states)
+	table_size = compiled.table.itemsize * len(compiled.table) + len(compiled.ranges) * 3 * 8
+	print("Unicode scanner: %d letter and %d digit ranges, built in %.2f s" % (len(letters), len(digits), seconds))
+	print("%d DFA states, %d transitions, compiled table of about %.1f KB" % (len(dfa.states), transitions, table_size / 1024))
+
+def startup():
+	"""Times the construction of "Lambda_Calculus" without a cache, with an empty cache and with a full one."""
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "startup.cache")
+		uncached, _ = time_call(Lambda_Calculus, 1000, 1000, None)
+		cold, _ = time_call(Lambda_Calculus, 1000, 1000, Startup_Cache(path, "benchmark"))
+		warm, _ = time_call(Lambda_Calculus, 1000, 1000, Startup_Cache(path, "benchmark"))
+	print("Lambda_Calculus(): %.1f ms without cache, %.1f ms filling cache, %.1f ms from cache" % (uncached * 1000, cold * 1000, warm * 1000))
+
+def random_term(rng, size):
+	"""Returns a random term of the lambda calculus, written as "Lambda_Calculus" expects, with about "size" \
+	variables."""
+	if size <= 1:
+		return rng.choice("xyz")
+	if rng.random() < 0.2:
+		return "λ" + rng.choice("xyz") + "." + random_term(rng, size - 1)
+	parts = []
+	while size > 0:
+		part_size = rng.randint(1, max(1, size // 2))
+		size -= part_size
+		if part_size == 1:
+			parts.append(rng.choice("xyz"))
+		else:
+			parts.append("(" + random_term(rng, part_size) + ")")
+	return " ".join(parts)
+
+def naive_cyk(cfg, token_array):
+	"""The CYK algorithm as "CFG_Parser.parse" implemented it before its rules were indexed, for comparison: \
+	every rule is tried on every pair of derivations."""
+	length = len(token_array)
+	table = [ [set() for _ in range(length)] for _ in range(length) ]
+	for i in range(length):
+		for rule in cfg.simple_rules:
+			parse_node = rule.make_node(token_array[i])
+			if parse_node != None:
+				table[i][i].add(parse_node)
+	for l in range(2, length+1):
+		for i in range(length-l+1):
+			for j in range(i+1, i+l):
+				for rule in cfg.complex_rules:
+					for left_node in table[i][j-1]:
+						for right_node in table[j][i+l-1]:
+							parse_node = rule.make_node(left_node, right_node)
+							if parse_node != None:
+								table[i][i+l-1].add(parse_node)
+	return [node for node in table[0][length-1] if node.lhs == cfg.start_token]
+
+def indexed_cyk(sizes = (50, 100, 200, 500), naive_limit = 120):
+	"""Times "CFG_Parser.parse" on random lambda terms of about "sizes" tokens, and compares it with \
+	"naive_cyk" on the terms of at most "naive_limit" tokens."""
+	lc = Lambda_Calculus()
+	rng = random.Random(1)
+	print("CYK parsing of lambda terms (seconds)")
+	print("tokens".rjust(8), "indexed".rjust(10), "naive".rjust(10), "speedup".rjust(8))
+	for size in sizes:
+		tokens = list(lc.tokenize(random_term(rng, size * 2 // 5)))
+		indexed_time, trees = time_call(lc.parser.parse, tokens)
+		if len(tokens) <= naive_limit:
+			naive_time, naive_trees = time_call(naive_cyk, lc.cfg, tokens)
+			assert set(naive_trees) == set(trees)
+			print(str(len(tokens)).rjust(8), ("%.3f" % indexed_time).rjust(10), ("%.3f" % naive_time).rjust(10), ("%.0fx" % (naive_time / indexed_time)).rjust(8))
+		else:
+			print(str(len(tokens)).rjust(8), ("%.3f" % indexed_time).rjust(10), "-".rjust(10), "-".rjust(8))
+
+def bitset_cyk(sizes = (50, 100, 200, 500), memory_limit = 250):
+	"""Compares the time and peak memory of "CFG_Parser.parse", which builds every derivation, with those of \
+	building the first tree of "CFG_Parser.parse_forest" and of "CFG_Parser.parse_one", which fills a chart of \
+	bitmasks and builds a single tree.  Since tracing memory \
+	slows parsing down severalfold, memory is only measured for inputs of at most "memory_limit" tokens."""
+	lc = Lambda_Calculus()
+	rng = random.Random(1)
+	print("CYK parsing of lambda terms (seconds, peak MB)")
+	print("tokens".rjust(8), "parse".rjust(10), "MB".rjust(8), "forest".rjust(10), "MB".rjust(8), "parse_one".rjust(10), "MB".rjust(8))
+	for size in sizes:
+		tokens = list(lc.tokenize(random_term(rng, size * 2 // 5)))
+		row = [str(len(tokens)).rjust(8)]
+		for method in [lc.parser.parse, lambda tokens: lc.parser.parse_forest(tokens).tree(), lc.parser.parse_one]:
+			seconds, _ = time_call(method, tokens)
+			row.append(("%.3f" % seconds).rjust(10))
+			if len(tokens) <= memory_limit:
+				tracemalloc.start()
+				method(tokens)
+				_, peak = tracemalloc.get_traced_memory()
+				tracemalloc.stop()
+				row.append(("%.1f" % (peak / 2 ** 20)).rjust(8))
+			else:
+				row.append("-".rjust(8))
+		print(*row)
+
+def random_pattern(rng, size):
+	"""Returns a random regular expression over {a, b, c} with "size" letters."""
+	if size == 1:
+		return rng.choice("abc") + rng.choice(["", "", "*"])
+	left = rng.randint(1, size - 1)
+	pattern = random_pattern(rng, left) + rng.choice(["", "|"]) + random_pattern(rng, size - left)
+	return "(" + pattern + ")" if rng.random() < 0.3 else pattern
+
+def earley(sizes = (50, 100, 200, 500)):
+	"""Compares "CFG_Parser.parse_one", on the grammar in Chomsky normal form, with "Earley_Parser.parse_one" and, \
+	when the grammar is LALR(1), "LALR_Parser.parse_one", on the original grammar, for lambda terms and for \
+	regular expressions of about "sizes" tokens."""
+	lc = Lambda_Calculus()
+	cyk = {"lambda": lc.parser, "regex": Regular_Expression.get_parser(Regular_Expression.default_alphabet)}
+	rng = random.Random(1)
+	print("Parsing one tree (seconds)")
+	print("grammar".rjust(8), "tokens".rjust(8), "CYK".rjust(10), "Earley".rjust(10), "LALR".rjust(10))
+	for grammar in ["lambda", "regex"]:
+		earley_parser = Earley_Parser(cyk[grammar].cfg)
+		lalr_parser = LALR_Parser(cyk[grammar].cfg)
+		for size in sizes:
+			if grammar == "lambda":
+				tokens = list(lc.tokenize(random_term(rng, size * 2 // 5)))
+			else:
+				tokens = [Token(name = s, token_type = "terminal") for s in random_pattern(rng, size // 2)]
+			cyk_time, _ = time_call(cyk[grammar].parse_one, tokens)
+			earley_time, _ = time_call(earley_parser.parse_one, tokens)
+			if len(lalr_parser.conflicts) == 0:
+				lalr_time = "%.4f" % time_call(lalr_parser.parse_one, tokens)[0]
+			else:
+				lalr_time = "-"
+			print(grammar.rjust(8), str(len(tokens)).rjust(8), ("%.3f" % cyk_time).rjust(10), ("%.3f" % earley_time).rjust(10), lalr_time.rjust(10))
+
+def synthetic_grammar(rule_count, seed = 1):
+	"""Returns a random list of "rule_count" rules over about rule_count/5 variables, of which a few are unit \
+	rules or have empty right-hand sides."""
+	rng = random.Random(seed)
+	variables = [Token(name = "<v" + str(n) + ">", token_type = "variable") for n in range(rule_count // 5 + 1)]
+	terminals = [Token(name = char, token_type = "terminal") for char in "abcdefgh"]
+	rules = []
+	for n in range(rule_count):
+		lhs = variables[n % len(variables)]
+		kind = rng.random()
+		if kind < 0.03:
+			rhs = [rng.choice(variables)]
+		elif kind < 0.04:
+			rhs = []
+		else:
+			rhs = [rng.choice(variables) if rng.random() < 0.5 else rng.choice(terminals) for _ in range(rng.randint(1, 5))]
+		rules.append(Static_Rule(lhs, rhs, lambda args: None))
+	return rules
+
+def cnf_conversion(sizes = (100, 300, 1000, 3000, 5000)):
+	"""Times "CFG.convert_rules_to_CNF" on synthetic grammars of "sizes" rules."""
+	print("Conversion to Chomsky normal form")
+	print("rules".rjust(8), "CNF rules".rjust(10), "seconds".rjust(10))
+	for size in sizes:
+		cfg = CFG(synthetic_grammar(size))
+		seconds, _ = time_call(cfg.convert_rules_to_CNF)
+		print(str(size).rjust(8), str(len(cfg.rules)).rjust(10), ("%.3f" % seconds).rjust(10))
+
+def incremental(size = 300):
+	"""Times reparsing a lambda term of about "size" tokens with "Incremental_Parser" after editing one variable \
+	near its start, middle and end, against parsing it from scratch."""
+	lc = Lambda_Calculus()
+	rng = random.Random(1)
+	tokens = list(lc.tokenize(random_term(rng, size * 2 // 5)))
+	positions = [n for n, token in enumerate(tokens) if token.token_type == "variable"]
+	print("Reparsing %d tokens after a one-token edit (seconds)" % len(tokens))
+	print("position".rjust(10), "scratch".rjust(10), "incremental".rjust(12))
+	for position in [positions[1], positions[len(positions) // 2], positions[-2]]:
+		parser = Incremental_Parser(lc.parser)
+		parser.parse_forest(tokens)
+		edited = tokens[:position] + [Token(name = "w", token_type = "variable")] + tokens[position+1:]
+		scratch_time, _ = time_call(lc.parser.parse_forest, edited)
+		incremental_time, _ = time_call(parser.parse_forest, edited)
+		print(str(position).rjust(10), ("%.3f" % scratch_time).rjust(10), ("%.3f" % incremental_time).rjust(12))
+
+def parallel_cyk(sizes = (200, 500, 1000), workers = (2, 4)):
+	"""Times "CFG_Parser.recognize" on random lambda terms of about "sizes" tokens, serially and with each number of \
+	"workers" processes."""
+	lc = Lambda_Calculus()
+	rng = random.Random(1)
+	parsers = [CFG_Parser(lc.cfg, workers = count, parallel_threshold = 0, parallel_work = 0) for count in workers]
+	print("Recognizing with %d CPUs (seconds)" % os.cpu_count())
+	print("tokens".rjust(8), "serial".rjust(10), *[("%d workers" % count).rjust(10) for count in workers])
+	for size in sizes:
+		tokens = list(lc.tokenize(random_term(rng, size * 2 // 5)))
+		serial_time, _ = time_call(lc.parser.recognize, tokens)
+		times = [time_call(parser.recognize, tokens)[0] for parser in parsers]
+		print(str(len(tokens)).rjust(8), ("%.3f" % serial_time).rjust(10), *[("%.3f" % seconds).rjust(10) for seconds in times])
+
+def engines(expressions = ("mul 3 4", "pow 2 5", "pow 3 4", "pred 9", "fix fac 3", "fix fac 4")):
+	"""Times reducing "expressions" to normal form with each of "Lambda_Calculus.engines"."""
+	calculi = {engine: Lambda_Calculus(engine = engine, recursion_limit = 100000, length_limit = 100000) for engine in Lambda_Calculus.engines}
+	print("Reducing to normal form (seconds)")
+	print("expression".rjust(12), *[engine.rjust(12) for engine in calculi])
+	for expression in expressions:
+		times = []
+		for lc in calculi.values():
+			try:
+				seconds, _ = time_call(lc.parse, expression)
+				times.append("%.4f" % seconds)
+			except (CannotSimplifyError, RecursionError):
+				times.append("-")
+		print(expression.rjust(12), *[time.rjust(12) for time in times])
+
+def reduction_memory(expression = "fix fac 5"):
+	"""Measures the peak memory allocated while reducing "expression" with each of "Lambda_Calculus.engines"."""
+	print("Reducing", expression)
+	print("engine".rjust(12), "peak MB".rjust(10), "interned".rjust(10))
+	for engine in Lambda_Calculus.engines:
+		lc = Lambda_Calculus(engine = engine, recursion_limit = 100000, length_limit = 100000)
+		value = lc.parse(expression, simplify = False)
+		tracemalloc.start()
+		result = lc.simplify(value)
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		print(engine.rjust(12), ("%.2f" % (peak / 1e6)).rjust(10), str(len(Lambda_Expression.interned)).rjust(10))
+
+def reduction_steps(expressions = ("pow 3 3", "fix fac 3", "fix fac 4", "fix fac 5")):
+	"""Counts the beta-reductions of normal-order reduction and of graph reduction of "expressions"."""
+	lc = Lambda_Calculus()
+	print("expression".rjust(12), "normal order".rjust(14), "graph".rjust(10))
+	for expression in expressions:
+		value = lc.parse(expression, simplify = False)
+		_, steps = value.to_de_bruijn().simplify(10 ** 6, 10 ** 6)
+		reducer = Graph_Reducer(10 ** 6)
+		reducer.reduce(value)
+		print(expression.rjust(12), str(steps).rjust(14), str(reducer.count).rjust(10))
+
+def krivine(expressions = ("pow 3 3", "fix fac 3", "fix fac 4", "fix fac 5")):
+	"""Compares the steps and time of "Lambda_Calculus.simplify_named" with those of "Krivine_Machine" on \
+	"expressions"."""
+	lc = Lambda_Calculus(recursion_limit = 10 ** 6, length_limit = 10 ** 6)
+	print("expression".rjust(12), "named steps".rjust(12), "seconds".rjust(10), "betas".rjust(10), "transitions".rjust(12), "seconds".rjust(10))
+	for expression in expressions:
+		value = lc.parse(expression, simplify = False)
+		_, steps = value.to_de_bruijn().simplify(10 ** 6, 10 ** 6)
+		named_time, _ = time_call(lc.simplify_named, value, False, 10 ** 6)
+		machine = Krivine_Machine(10 ** 6)
+		machine_time, _ = time_call(machine.reduce, value)
+		print(expression.rjust(12), str(steps).rjust(12), ("%.4f" % named_time).rjust(10), str(machine.count).rjust(10), str(machine.transitions).rjust(12), ("%.4f" % machine_time).rjust(10))
+
+def native_numbers(expressions = ("plus 30 40", "pow 3 4", "mul (pow 2 5) 7", "pred (pow 2 6)", "fix fac 4")):
+	"""Times reducing "expressions" with Church numerals and with "Numeral"s."""
+	pure = Lambda_Calculus(recursion_limit = 10 ** 6, length_limit = 10 ** 6)
+	native = Lambda_Calculus(recursion_limit = 10 ** 6, length_limit = 10 ** 6, native_numbers = True)
+	print("expression".rjust(16), "church".rjust(10), "native".rjust(10))
+	for expression in expressions:
+		pure_time, _ = time_call(pure.parse, expression)
+		native_time, _ = time_call(native.parse, expression)
+		print(expression.rjust(16), ("%.4f" % pure_time).rjust(10), ("%.4f" % native_time).rjust(10))
+
+benchmarks = {
+	"scan": scan_scaling,
+	"minimize": minimization,
+	"subset": subset_construction,
+	"unicode": unicode_scanner,
+	"startup": startup,
+	"cyk": indexed_cyk,
+	"bitset": bitset_cyk,
+	"earley": earley,
+	"cnf": cnf_conversion,
+	"incremental": incremental,
+	"parallel": parallel_cyk,
+	"engines": engines,
+	"memory": reduction_memory,
+	"steps": reduction_steps,
+	"krivine": krivine,
+	"numbers": native_numbers,
+}
+
+if __name__ == "__main__":
+	for name in argv[1:] or list(benchmarks):
+		benchmarks[name]()
@@ -1,13 +1,20 @@
+from itertools import chain
+
 class CFG:
 	def __init__(self, rules):
 		if len(rules) == 0:
 			raise NoStatic_RulesError
 		self.tokens = set()
+		# Maps each expansion (A_1, ..., A_n) to the variable {A_1...A_n} standing for it
+		self.abbreviations = {}
 
 		self.rules = set(rules)
 		start_variable = rules[0].lhs
 		self.start_token = Token(name = "<start>", cfg = self)
-		self.rules.add( Static_Rule(self.start_token, [start_variable], None) )
+		start_rule = Static_Rule(self.start_token, [start_variable], None)
+		self.rules.add(start_rule)
+		# The rules as given, which the rules in Chomsky normal form refer to for their evaluations
+		self.original_rules = list(rules) + [start_rule]
 		for rule in rules:
 			self.tokens.add(rule.lhs)
 			for token in rule.rhs:
@@ -16,10 +23,13 @@ class CFG:
 		self.complex_rules = set()
 
 	def exists(self, expansion):
-		for token in self.tokens:
-			if token.expansion == expansion:
-				return token
-		return None 
+		return self.abbreviations.get(tuple(expansion))
+
+	def abbreviate(self, expansion):
+		"""Returns a new variable {A_1...A_n} standing for "expansion", the list [A_1, ..., A_n]."""
+		token = Token(expansion = expansion, token_type = "variable", cfg = self)
+		self.abbreviations[tuple(expansion)] = token
+		return token
 
 	def add_simple_rule(self, variable, terminal, evaluation):
 		new_rule = Static_Rule(variable, [terminal], lambda x: evaluation)
@@ -36,13 +46,11 @@ class CFG:
 		for rule in self.rules:
 			for terminal in filter(lambda token: token.name not in convert, rule.terminals()):
 				t_var = Token(name = terminal.name + "v", token_type = "variable", cfg = self)
-				t_rule = Static_Rule(t_var, [terminal], lambda a: None)
+				t_rule = Static_Rule(t_var, [terminal], ignore_value)
 				new_rules.add(t_rule)
 				convert[terminal.name] = t_var
 
-		for rule in self.rules:
-			rule.replace_terminals(convert)
-		self.rules |= new_rules
+		self.rules = {rule.replace_terminals(convert) for rule in self.rules} | new_rules
 
 		# Split rules of the form A -> B_0...B_n into rules of the form A -> B_0{B_1...B_n} and
 		# {B_i...B_n} -> B_i{B_(i+1)...B_n} for i <= n-2
@@ -54,26 +62,128 @@ class CFG:
 				new_rules.add(rule)
 		self.rules = new_rules
 
-		# Eliminate rules of the form A -> ε 
+		# Eliminate rules of the form A -> ε.  A variable is nullable once every token on the right-hand side of
+		# one of its rules is; "remaining" counts the tokens of each rule not yet known to be nullable.
+		static_rules = [rule for rule in self.rules if not isinstance(rule, Dynamic_Rule)]
+		remaining = [len(rule.rhs) for rule in static_rules]
+		occurrences = {}
+		for number, rule in enumerate(static_rules):
+			for token in rule.rhs:
+				occurrences.setdefault(token, []).append(number)
 		nullables = set()
-		old_len = -1
-		while len(nullables) > old_len:
-			old_len = len(nullables)
-			for rule in self.rules:
-				if rule.is_nullable():
-					nullables.add(rule.lhs)
-					rule.lhs.set_nullable()
+		worklist = [rule.lhs for rule in static_rules if len(rule.rhs) == 0]
+		while len(worklist) > 0:
+			variable = worklist.pop()
+			if variable in nullables:
+				continue
+			nullables.add(variable)
+			for number in occurrences.get(variable, []):
+				remaining[number] -= 1
+				if remaining[number] == 0:
+					worklist.append(static_rules[number].lhs)
+		for rule in static_rules:
+			for token in [rule.lhs] + rule.rhs:
+				if token in nullables:
+					token.set_nullable()
 
 		new_rules = set()
 		for rule in self.rules:
 			rule.remove_nullables(new_rules)
 		self.rules = {rule for rule in new_rules if rule.is_not_empty()}
 
-		# Eliminate rules of the form A -> B, where B is a variable
-		removed_rules = set()
-		while remove_unit_rule(self.rules, removed_rules):
-			pass
+		# Eliminate rules of the form A -> B, where B is a variable, by giving A the other rules of every variable
+		# reachable from A by such rules
+		unit_rules = {}
+		other_rules = {}
+		for rule in self.rules:
+			if rule.is_unit():
+				unit_rules.setdefault(rule.lhs, []).append(rule)
+			else:
+				other_rules.setdefault(rule.lhs, []).append(rule)
+		new_rules = {rule for rule in self.rules if not rule.is_unit()}
+		for variable, rules in unit_rules.items():
+			reachable = {variable}
+			stack = [rule.rhs[0] for rule in rules]
+			while len(stack) > 0:
+				target = stack.pop()
+				if target in reachable:
+					continue
+				reachable.add(target)
+				for rule in other_rules.get(target, []):
+					new_rules.add(rule.get_merger(rules[0]))
+				stack += [rule.rhs[0] for rule in unit_rules.get(target, [])]
+		self.rules = new_rules
+
+		self.simple_rules = {rule for rule in self.rules if len(rule.rhs) < 2}
+		self.complex_rules = {rule for rule in self.rules if len(rule.rhs) >= 2}
 
+	def to_tuple(self):
+		"""Returns a representation of the rules in Chomsky normal form built only of tuples, strings, integers
+		and None, suitable for "marshal".  Evaluations and match functions are recorded as indices into
+		"original_rules", so the representation can only be loaded by a "CFG" built from equivalent rules.  The
+		"old_rule"s of split rules are listed separately, each once, so that the rules split from the same rule
+		share it again when loaded."""
+		evaluations = {id(rule.evaluation): number for number, rule in enumerate(self.original_rules)}
+		dynamic_rules = {(id(rule.evaluation), id(rule.match_function)): number for number, rule in enumerate(self.original_rules)}
+		tokens = []
+		token_numbers = {}
+		def number_token(token):
+			if token not in token_numbers:
+				expansion = None
+				if token.expansion != None:
+					expansion = tuple(number_token(t) for t in token.expansion)
+				token_numbers[token] = len(tokens)
+				tokens.append((token.name, token.token_type, expansion))
+			return token_numbers[token]
+		def number_evaluation(evaluation):
+			if evaluation == None:
+				return None
+			elif evaluation is ignore_value:
+				return -1
+			return evaluations[id(evaluation)]
+		old_rules = []
+		old_rule_numbers = {}
+		def number_old_rule(rule):
+			if id(rule) not in old_rule_numbers:
+				old_rule_numbers[id(rule)] = len(old_rules)
+				old_rules.append((number_token(rule.lhs), tuple(number_token(t) for t in rule.rhs), number_evaluation(rule.evaluation)))
+			return old_rule_numbers[id(rule)]
+		rules = []
+		for rule in self.rules:
+			lhs = number_token(rule.lhs)
+			if isinstance(rule, Dynamic_Rule):
+				rules.append(("dynamic", lhs, dynamic_rules[(id(rule.evaluation), id(rule.match_function))]))
+				continue
+			old_rule = None if rule.old_rule == None else number_old_rule(rule.old_rule)
+			rules.append(("static", lhs, tuple(number_token(t) for t in rule.rhs), number_evaluation(rule.evaluation), old_rule))
+		return (tuple(tokens), tuple(rules), tuple(old_rules))
+
+	def load_tuple(self, data):
+		"""Replaces own rules with the rules in Chomsky normal form represented by "data" (see "to_tuple")."""
+		tokens = []
+		for name, token_type, expansion in data[0]:
+			if expansion == None:
+				tokens.append(Token(name = name, token_type = token_type, cfg = self))
+			else:
+				tokens.append(Token(expansion = [tokens[n] for n in expansion], token_type = token_type, cfg = self))
+				tokens[-1].name = name
+		def get_evaluation(number):
+			if number == None:
+				return None
+			elif number == -1:
+				return ignore_value
+			return self.original_rules[number].evaluation
+		old_rules = [Static_Rule(tokens[lhs], [tokens[n] for n in rhs], get_evaluation(evaluation)) for lhs, rhs, evaluation in data[2]]
+		self.rules = set()
+		for entry in data[1]:
+			if entry[0] == "dynamic":
+				original = self.original_rules[entry[2]]
+				self.rules.add(Dynamic_Rule(tokens[entry[1]], original.evaluation, original.match_function))
+				continue
+			_, lhs, rhs, evaluation, old_rule = entry
+			if old_rule != None:
+				old_rule = old_rules[old_rule]
+			self.rules.add(Static_Rule(tokens[lhs], [tokens[n] for n in rhs], get_evaluation(evaluation), old_rule = old_rule))
 		self.simple_rules = {rule for rule in self.rules if len(rule.rhs) < 2}
 		self.complex_rules = {rule for rule in self.rules if len(rule.rhs) >= 2}
 
@@ -83,24 +193,9 @@ class CFG:
 				return False
 		return True
 
-def remove_unit_rule(rules, removed_rules):
-	unit_rule = None
-	for rule in rules:
-		if rule.is_unit():
-			unit_rule = rule
-			removed_rules.add(rule)
-			break
-	if unit_rule == None:
-		return False
-	new_rules = set()
-	for rule in rules:
-		if rule.lhs == unit_rule.rhs[0]:
-			new_rule = rule.get_merger(unit_rule)
-			if new_rule not in removed_rules:
-				new_rules.add(new_rule)
-	rules |= new_rules
-	rules.remove(unit_rule)
-	return True
+def ignore_value(value):
+	"""The evaluation of the rules V_t -> t introduced to replace terminals t in longer rules"""
+	return None
 
 class Rule:
 	"""Represents a rule of the form A -> B_1...B_n, where each B_i is a variable or terminal token"""
@@ -161,12 +256,14 @@ class Rule:
 			return []
 
 	def replace_terminals(self, convert):
-		if len(self.rhs) == 1:
-			return None
-		for i in range(len(self.rhs)):
-			token = self.rhs[i]
-			if token.name in convert:
-				self.rhs[i] = convert[token.name]
+		"""Returns a copy of the rule in which each token named in "convert" is replaced by the corresponding variable,
+		or the rule itself if its right-hand side has fewer than two tokens.  The rule itself is left unchanged, so
+		that the rules given to "CFG" remain available to parsers which do not need Chomsky normal form."""
+		if len(self.rhs) < 2:
+			return self
+		new_rule = self.copy()
+		new_rule.rhs = [convert.get(token.name, token) for token in self.rhs]
+		return new_rule
 
 	def split_up(self, rules, cfg):
 		names = [token.name for token in self.rhs]
@@ -174,10 +271,11 @@ class Rule:
 		for i in range(len(self.rhs)-2):
 			new_variable = cfg.exists(self.rhs[i+1:])
 			if new_variable != None:
+				# The rules for the rest of the right-hand side were added when the variable was created
 				rules.add( Static_Rule(current_variable, [self.rhs[i], new_variable], self.evaluation, old_rule = self) )
 				return None
 			else:
-				new_variable = Token(expansion = self.rhs[i+1:], cfg = cfg)
+				new_variable = cfg.abbreviate(self.rhs[i+1:])
 				rules.add( Static_Rule(current_variable, [self.rhs[i], new_variable], self.evaluation, old_rule = self) )
 				current_variable = new_variable
 		rules.add( Static_Rule(current_variable, self.rhs[-2:], self.evaluation, old_rule = self) )
@@ -260,48 +358,772 @@ class CFG_Parser:
 	represent that sequence.  A "Parse_Node" (A, t, A -> t) represents the token t.
 	If p = (A, ...) represents s_1...s_i and q = (B, ...) represents t_1...t_j, then
 	(C, [p, q], C -> AB) represents s_1...s_it_1...t_j."""
-	def __init__(self, cfg):
+	def __init__(self, cfg, workers = 1, parallel_threshold = 300, parallel_work = 1200):
+		"""Indexes the rules of "cfg", which must already be in Chomsky normal form: "binary_rules" maps each \
+		pair (B, C) to the rules A -> BC, "terminal_rules" maps each terminal b to the rules A -> b, and \
+		"dynamic_rules" lists the "Dynamic_Rule"s, which must be tried on every token.  If "workers" is greater \
+		than 1, the bitset chart of a list of at least "parallel_threshold" tokens is filled by that many processes, \
+		except for the diagonals whose number of cells times their span length is less than "parallel_work"."""
 		self.cfg = cfg
+		self.workers = workers
+		self.parallel_threshold = parallel_threshold
+		self.parallel_work = parallel_work
+		self.binary_rules = {}
+		self.terminal_rules = {}
+		self.dynamic_rules = []
+		for rule in cfg.complex_rules:
+			self.binary_rules.setdefault(tuple(rule.rhs), []).append(rule)
+		for rule in cfg.simple_rules:
+			if isinstance(rule, Dynamic_Rule):
+				self.dynamic_rules.append(rule)
+			elif len(rule.rhs) == 1:
+				self.terminal_rules.setdefault(rule.rhs[0], []).append(rule)
+		# For the bitset recognizer, variables are numbered 0, 1, ..., and "pair_rules[B]" lists the triples
+		# (bit of C, bit of A, A -> BC) for the rules whose right-hand side begins with the variable numbered B.
+		self.variables = []
+		self.variable_numbers = {}
+		for rule in chain(cfg.simple_rules, cfg.complex_rules):
+			for variable in [rule.lhs] + (rule.rhs if len(rule.rhs) == 2 else []):
+				if variable not in self.variable_numbers:
+					self.variable_numbers[variable] = len(self.variables)
+					self.variables.append(variable)
+		self.pair_rules = [[] for _ in self.variables]
+		for rule in cfg.complex_rules:
+			left, right = [self.variable_numbers[variable] for variable in rule.rhs]
+			self.pair_rules[left].append((1 << right, 1 << self.variable_numbers[rule.lhs], rule))
+		# "right_masks[B]" is the set of all C such that some rule has the right-hand side BC
+		self.right_masks = [0] * len(self.variables)
+		for left, rules in enumerate(self.pair_rules):
+			for right_bit, _, _ in rules:
+				self.right_masks[left] |= right_bit
+
+	def leaf_nodes(self, token):
+		"""Returns the list of "Parse_Node"s which represent the single token "token"."""
+		nodes = [Parse_Node(rule.lhs, [token], rule) for rule in self.terminal_rules.get(token, [])]
+		for rule in self.dynamic_rules:
+			parse_node = rule.make_node(token)
+			if parse_node != None:
+				nodes.append(parse_node)
+		return nodes
 
 	def parse(self, token_array):
 		"""Converts a list of tokens into a list of "Parse_Node"s, each of which is the root of
-		a derivation tree for that list of tokens."""
-
+		a derivation tree for that list of tokens.  No two of the trees are equal: trees with the same shape
+		differ in the evaluation of some rule.  The number of trees may be exponential in the number of tokens;
+		"parse_forest" builds them only on demand."""
+		return list(self.parse_forest(token_array))
+
+	def parse_forest(self, token_array, priority = None):
+		"""Returns the "Parse_Forest" of all derivation trees of the list of tokens.  Derivations of the same variable \
+		from the same substring are shared, so the forest takes space polynomial in the number of tokens even when \
+		the number of trees is exponential.  If "priority" is not None, it maps rules to keys, and trees whose \
+		rules have smaller keys are preferred (see "Parse_Forest")."""
+		table = self.fill_forest_chart(token_array)
+		return Parse_Forest(table[0][-1].get(self.cfg.start_token), priority = priority)
+
+	def fill_forest_chart(self, token_array, table = None):
+		"""Returns the chart of the CYK algorithm, in which table[i][j] maps each variable A to the "Forest_Node" of \
+		all derivations from A of w_i...w_j, where j >= i.  If "table" is given, only its cells which are None are \
+		computed; the others are kept."""
 		length = len(token_array)
 		if length == 0:
 			raise EmptyError
-		table = [ [set() for _ in range(length)] for _ in range(length) ]
-		# table[i][j] consists of all derivations of the substring w_i...w_j, where j >= i
+		if table == None:
+			table = [ [None] * length for _ in range(length) ]
 		for i in range(length):
-			token = token_array[i]
-			for rule in self.cfg.simple_rules:
-				parse_node = rule.make_node(token)
-				if parse_node != None:
-					#print("Adding:", parse_node)
-					table[i][i].add(parse_node)
-		# We will search for progressively longer derivations of the form A -> BC in the table.
-		# The derivations of the each of the three terms will span the following ranges:
-		# A: [i, i+l-1]
-		# B: [i, j-1]
-		# C: [j-1, i+l-1]
-		# We must have i+l-1 <= length-1, and so i <= length-l.
+			if table[i][i] != None:
+				continue
+			cell = table[i][i] = {}
+			for parse_node in self.leaf_nodes(token_array[i]):
+				if parse_node.lhs not in cell:
+					cell[parse_node.lhs] = Forest_Node(parse_node.lhs, i, i)
+				# Derivations of the same variable from the same token are identical trees, unless their rules
+				# evaluate the token differently, as "Dynamic_Rule"s matching the same token may
+				packings = cell[parse_node.lhs].packings
+				if not any(packing.rule.evaluation is parse_node.rule.evaluation for packing in packings):
+					packings.append(parse_node)
+		binary_rules = self.binary_rules
 		for l in range(2, length+1):
 			for i in range(length-l+1):
+				if table[i][i+l-1] != None:
+					continue
+				full_s = table[i][i+l-1] = {}
 				for j in range(i+1, i+l):
 					prefix = table[i][j-1]
 					suffix = table[j][i+l-1]
-					full_s = table[i][i+l-1]
-					for rule in self.cfg.complex_rules:
-						left_variables = []
-						right_variables = []
-						for left_node in prefix:
-							for right_node in suffix:
-
-								parse_node = rule.make_node(left_node, right_node)
-								if parse_node != None:
-									#print(left_node, right_node, "by", rule)
-									full_s.add( parse_node )
-		return [node for node in table[0][length-1] if node.lhs == self.cfg.start_token]
+					if len(prefix) == 0 or len(suffix) == 0:
+						continue
+					for left_variable, left_node in prefix.items():
+						for right_variable, right_node in suffix.items():
+							rules = binary_rules.get((left_variable, right_variable))
+							if rules == None:
+								continue
+							for rule in rules:
+								if rule.lhs not in full_s:
+									full_s[rule.lhs] = Forest_Node(rule.lhs, i, i+l-1)
+								full_s[rule.lhs].packings.append((rule, left_node, right_node))
+		return table
+
+	def fill_bitset_chart(self, token_array):
+		"""Runs the CYK algorithm with cells represented as bitmasks, and returns the pair (chart, back).  Bit A of \
+		chart[i][j] is set iff the variable numbered A derives w_i...w_j.  back[i][j] maps A to the first \
+		derivation found: the "Parse_Node" of a token if i = j, and otherwise the pair (k, A -> BC), where B \
+		derives w_i...w_(k-1) and C derives w_k...w_j; back[i][j] is None if chart[i][j] is 0."""
+		length = len(token_array)
+		if self.workers > 1 and length >= self.parallel_threshold:
+			return self.fill_bitset_chart_parallel(token_array)
+		chart, back = self.bitset_leaves(token_array)
+		# columns[j][k] is chart[k][j], so that the column a cell depends on is a slice
+		columns = [[chart[k][j] for k in range(length)] for j in range(length)]
+		for l in range(2, length+1):
+			for i in range(length-l+1):
+				end = i+l-1
+				mask, pointers = bitset_cell(i, chart[i][i:end], columns[end][i+1:end+1], self.pair_rules, self.right_masks)
+				if mask:
+					chart[i][end] = columns[end][i] = mask
+					back[i][end] = pointers
+		return chart, back
+
+	def bitset_leaves(self, token_array):
+		"""Returns the pair (chart, back) of "fill_bitset_chart" with only the cells of single tokens filled."""
+		length = len(token_array)
+		if length == 0:
+			raise EmptyError
+		chart = [[0] * length for _ in range(length)]
+		back = [[None] * length for _ in range(length)]
+		for i in range(length):
+			back[i][i] = {}
+			for parse_node in self.leaf_nodes(token_array[i]):
+				number = self.variable_numbers.get(parse_node.lhs)
+				if number != None and number not in back[i][i]:
+					chart[i][i] |= 1 << number
+					back[i][i][number] = parse_node
+		return chart, back
+
+	def fill_bitset_chart_parallel(self, token_array):
+		"""Does the same as "fill_bitset_chart", but divides the cells of each diagonal, whose spans have the same \
+		length and so depend only on cells of earlier diagonals, among "workers" processes.  The masks are kept in \
+		shared memory as "words" unsigned 64-bit integers each, both by rows and by columns, so that processes can \
+		read the row and column a cell depends on in one piece; each process returns the masks and back-pointers \
+		of its cells.  The cells of single tokens, which may call match functions of "Dynamic_Rule"s, and \
+		diagonals with too little work to be worth distributing are filled by the calling process."""
+		# Imported here, since importing takes longer than most parses
+		from multiprocessing import Pool, shared_memory
+		chart, back = self.bitset_leaves(token_array)
+		length = len(token_array)
+		words = max(1, (len(self.variables) + 63) // 64)
+		rules = [rule for rules in self.pair_rules for _, _, rule in rules]
+		rule_numbers = {id(rule): number for number, rule in enumerate(rules)}
+		pair_rules = [[(right_bit, lhs_bit, rule_numbers[id(rule)]) for right_bit, lhs_bit, rule in pair] for pair in self.pair_rules]
+		memory = shared_memory.SharedMemory(create = True, size = 2 * length * length * words * 8)
+		try:
+			rows = memory.buf.cast("Q")
+			columns = rows[length * length * words:]
+			# The views must be released before the memory is closed, even if filling the chart fails
+			try:
+				def store(i, j, mask):
+					for word in range(words):
+						value = mask >> (64 * word) & 0xFFFFFFFFFFFFFFFF
+						rows[(i * length + j) * words + word] = value
+						columns[(j * length + i) * words + word] = value
+				for i in range(length):
+					store(i, i, chart[i][i])
+				arguments = (memory.name, words, length, pair_rules, self.right_masks)
+				with Pool(self.workers, initializer = start_bitset_worker, initargs = arguments) as pool:
+					for l in range(2, length+1):
+						count = length - l + 1
+						if count * l < self.parallel_work:
+							cells = []
+							for i in range(count):
+								row = chart[i][i:i+l-1]
+								column = [chart[k][i+l-1] for k in range(i+1, i+l)]
+								cells.append(bitset_cell(i, row, column, pair_rules, self.right_masks))
+							results = [(0, cells)]
+						else:
+							chunk = -(-count // (self.workers * 4))
+							tasks = [(l, first, min(first + chunk, count)) for first in range(0, count, chunk)]
+							results = zip([first for _, first, _ in tasks], pool.map(fill_bitset_cells, tasks))
+						for first, cells in results:
+							for i, (mask, pointers) in enumerate(cells, first):
+								if mask:
+									end = i+l-1
+									chart[i][end] = mask
+									back[i][end] = {number: (k, rules[rule]) for number, (k, rule) in pointers.items()}
+									store(i, end, mask)
+			finally:
+				columns.release()
+				rows.release()
+		finally:
+			try:
+				memory.close()
+			finally:
+				memory.unlink()
+		return chart, back
+
+	def recognize(self, token_array):
+		"""Returns whether the list of tokens can be derived from the start variable, without building any \
+		"Parse_Node"s other than those of single tokens."""
+		chart, _ = self.fill_bitset_chart(token_array)
+		start = self.variable_numbers.get(self.cfg.start_token)
+		return start != None and chart[0][-1] >> start & 1 == 1
+
+	def parse_one(self, token_array):
+		"""Returns the root of one derivation tree for the list of tokens, or None if there is none.  Only the \
+		"Parse_Node"s of the chosen tree are built, after the bitset chart has been filled."""
+		chart, back = self.fill_bitset_chart(token_array)
+		start = self.variable_numbers.get(self.cfg.start_token)
+		length = len(token_array)
+		if start == None or chart[0][length-1] >> start & 1 == 0:
+			return None
+		# Visit the derivations of the tree from the root down, then build their nodes from the leaves up
+		order = []
+		stack = [(0, length-1, start)]
+		while len(stack) > 0:
+			i, j, number = stack.pop()
+			order.append((i, j, number))
+			if i != j:
+				k, rule = back[i][j][number]
+				stack.append((i, k-1, self.variable_numbers[rule.rhs[0]]))
+				stack.append((k, j, self.variable_numbers[rule.rhs[1]]))
+		nodes = {}
+		for i, j, number in reversed(order):
+			if i == j:
+				nodes[(i, j, number)] = back[i][j][number]
+			else:
+				k, rule = back[i][j][number]
+				left = nodes[(i, k-1, self.variable_numbers[rule.rhs[0]])]
+				right = nodes[(k, j, self.variable_numbers[rule.rhs[1]])]
+				nodes[(i, j, number)] = Parse_Node(rule.lhs, [left, right], rule)
+		return nodes[(0, length-1, start)]
+
+class Incremental_Parser:
+	"""Parses successive, similar lists of tokens with a "CFG_Parser", reusing the cells of the previous chart."""
+
+	"""A cell of the CYK chart depends only on the tokens its span covers.  When a list of tokens shares a prefix
+	of p tokens and a suffix of s tokens with the previous one, the cells covering only the prefix are kept, those
+	covering only the suffix are shifted to their new positions, and only the cells whose spans contain a changed
+	token are computed anew; the shifted cells get new "Forest_Node"s, so that forests returned earlier keep their
+	spans.  "reset" discards the chart, which must be done whenever the outcome of the match functions of
+	"Dynamic_Rule"s may have changed.  "Lambda_Calculus" parses with it only when its grammar has conflicts, so
+	that it has no "LALR_Parser"."""
+	def __init__(self, parser):
+		self.parser = parser
+		self.reset()
+
+	def reset(self):
+		self.tokens = []
+		self.table = []
+
+	def parse_forest(self, token_array, priority = None):
+		"""Returns the "Parse_Forest" of all derivation trees of the list of tokens (see "CFG_Parser.parse_forest")."""
+		token_array = list(token_array)
+		old_length = len(self.tokens)
+		length = len(token_array)
+		prefix = 0
+		while prefix < min(length, old_length) and token_array[prefix] == self.tokens[prefix]:
+			prefix += 1
+		suffix = 0
+		while suffix < min(length, old_length) - prefix and token_array[length-1-suffix] == self.tokens[old_length-1-suffix]:
+			suffix += 1
+		shift = length - old_length
+		table = [ [None] * length for _ in range(length) ]
+		for i in range(prefix):
+			for j in range(i, prefix):
+				table[i][j] = self.table[i][j]
+		# The children of a node in the suffix are in the suffix too, so shorter spans are shifted first
+		copies = {}
+		for l in range(1, suffix+1):
+			for i in range(length - suffix, length - l + 1):
+				j = i + l - 1
+				cell = self.table[i - shift][j - shift]
+				if shift != 0:
+					shifted = {}
+					for variable, node in cell.items():
+						copy = shifted[variable] = copies[id(node)] = Forest_Node(variable, i, j)
+						if node.is_leaf():
+							copy.packings = list(node.packings)
+						else:
+							copy.packings = [(rule, copies[id(left)], copies[id(right)]) for rule, left, right in node.packings]
+					cell = shifted
+				table[i][j] = cell
+		self.table = self.parser.fill_forest_chart(token_array, table)
+		self.tokens = token_array
+		return Parse_Forest(self.table[0][-1].get(self.parser.cfg.start_token), priority = priority)
+
+	def parse(self, token_array):
+		"""Returns a list of the roots of all derivation trees of the list of tokens (see "CFG_Parser.parse")."""
+		return list(self.parse_forest(token_array))
+
+class Original_Rules_Parser:
+	"""Base class of parsers which convert sequences of tokens into trees of "Parse_Node"s using the rules originally
+	given to a "CFG", rather than their conversion to Chomsky normal form."""
+
+	"""The trees built have the same values as the unwound trees of "CFG_Parser": a rule of the form A -> B, where B
+	is a variable, does not get a node of its own; instead the node of B is relabelled A, just as the conversion
+	to Chomsky normal form merges such rules into the rules for B.  A terminal in a longer rule yields a node
+	whose value is None.  A "Dynamic_Rule" A -> ? derives a single token accepted by its match function.  Rules
+	with empty right-hand sides are not supported."""
+	def __init__(self, cfg):
+		self.cfg = cfg
+		self.static_rules = {}
+		self.dynamic_rules = {}
+		for rule in cfg.original_rules:
+			if isinstance(rule, Dynamic_Rule):
+				self.dynamic_rules.setdefault(rule.lhs, []).append(rule)
+			elif len(rule.rhs) == 0:
+				raise InvalidRuleError(rule)
+			else:
+				self.static_rules.setdefault(rule.lhs, []).append(rule)
+		# The rules V_t -> t whose nodes stand for terminals t in longer rules
+		self.terminal_rules = {}
+		for rules in self.static_rules.values():
+			for rule in rules:
+				for token in rule.rhs:
+					if len(rule.rhs) > 1 and not self.is_variable(token) and token not in self.terminal_rules:
+						self.terminal_rules[token] = Static_Rule(token, [token], ignore_value)
+
+	def is_variable(self, token):
+		return token in self.static_rules or token in self.dynamic_rules
+
+	def rule_node(self, rule, children):
+		"""Returns the "Parse_Node" for an application of "rule" to "children", each of which is a "Parse_Node" or,
+		for the terminals of the right-hand side of "rule", a token."""
+		if len(children) == 1:
+			if isinstance(children[0], Parse_Node):
+				return Parse_Node(rule.lhs, children[0].rhs, children[0].rule)
+			return Parse_Node(rule.lhs, children, rule)
+		for n, child in enumerate(children):
+			if not isinstance(child, Parse_Node):
+				children[n] = Parse_Node(child, [child], self.terminal_rules[rule.rhs[n]])
+		return Parse_Node(rule.lhs, children, rule)
+
+	def parse(self, token_array):
+		"""Returns a list containing the root of one derivation tree for the list of tokens, or an empty list
+		if there is none.  Unlike "CFG_Parser.parse", at most one tree is returned even if the list of tokens
+		is ambiguous."""
+		tree = self.parse_one(token_array)
+		return [] if tree == None else [tree]
+
+class Earley_Parser(Original_Rules_Parser):
+	"""Converts sequence of tokens into tree of "Parse_Node"s with Earley's algorithm."""
+
+	"""Earley's algorithm needs no conversion to Chomsky normal form, and takes time linear in the number of tokens
+	for most unambiguous grammars.  An item (A -> B_1...B_n, d, k) in the set of position i records that B_1...B_d
+	derives w_k...w_(i-1).  An item of a "Dynamic_Rule" is complete after one token."""
+	def rule_length(rule):
+		return 1 if isinstance(rule, Dynamic_Rule) else len(rule.rhs)
+
+	def fill_chart(self, token_array):
+		"""Returns the list of Earley sets for the list of tokens.  The set of position i maps each of its items
+		(rule, d, k) to the first way it was found: None if it was predicted, and otherwise the pair (item, child),
+		where "item" is (rule, d-1, k) in the set of the position j at which B_d starts, and "child" is j if B_d
+		is a terminal, and otherwise the complete item (rule', length of rule', j) in the set of position i."""
+		length = len(token_array)
+		if length == 0:
+			raise EmptyError
+		rule_length = Earley_Parser.rule_length
+		charts = [{} for _ in range(length + 1)]
+		# waiting[i] maps each variable B to the items of the set of position i whose next token is B
+		waiting = [{} for _ in range(length + 1)]
+		for i in range(length + 1):
+			chart = charts[i]
+			token = token_array[i] if i < length else None
+			agenda = list(chart)
+			if i == 0:
+				agenda.append(None)
+			predicted = set()
+			while len(agenda) > 0:
+				item = agenda.pop()
+				if item == None:
+					variable = self.cfg.start_token
+				else:
+					rule, dot, origin = item
+					if dot == rule_length(rule):
+						# Completion: advance the items which were waiting for the variable just derived
+						for rule_2, dot_2, origin_2 in waiting[origin].get(rule.lhs, []):
+							new_item = (rule_2, dot_2 + 1, origin_2)
+							if new_item not in chart:
+								chart[new_item] = ((rule_2, dot_2, origin_2), item)
+								agenda.append(new_item)
+						continue
+					variable = rule.rhs[dot]
+					if not self.is_variable(variable):
+						# Scanning
+						if token != None and variable == token:
+							new_item = (rule, dot + 1, origin)
+							if new_item not in charts[i + 1]:
+								charts[i + 1][new_item] = (item, i)
+						continue
+					# Since no rule has an empty right-hand side, the variable cannot yet have been derived at i
+					waiting[i].setdefault(variable, []).append(item)
+				if variable in predicted:
+					continue
+				predicted.add(variable)
+				for rule in self.static_rules.get(variable, []):
+					new_item = (rule, 0, i)
+					if new_item not in chart:
+						chart[new_item] = None
+						agenda.append(new_item)
+				if token != None:
+					for rule in self.dynamic_rules.get(variable, []):
+						if rule.match_function(token, []):
+							new_item = (rule, 1, i)
+							if new_item not in charts[i + 1]:
+								charts[i + 1][new_item] = ((rule, 0, i), i)
+		return charts
+
+	def recognize(self, token_array):
+		"""Returns whether the list of tokens can be derived from the start variable."""
+		return self.final_item(self.fill_chart(token_array)) != None
+
+	def final_item(self, charts):
+		for rule in self.static_rules.get(self.cfg.start_token, []):
+			if (rule, len(rule.rhs), 0) in charts[-1]:
+				return (rule, len(rule.rhs), 0)
+		return None
+
+	def parse_one(self, token_array):
+		"""Returns the root of one derivation tree for the list of tokens, or None if there is none."""
+		charts = self.fill_chart(token_array)
+		root = self.final_item(charts)
+		if root == None:
+			return None
+		# List the complete items of the tree from the root down, each followed by its children from the right;
+		# in reverse, every complete item comes after those of its children
+		order = []
+		stack = [(root, len(token_array))]
+		while len(stack) > 0:
+			item, end = stack.pop()
+			order.append((item, end))
+			position = end
+			current = item
+			while current[1] > 0:
+				previous, child = charts[position][current]
+				if not isinstance(child, int):
+					stack.append((child, position))
+					position = child[2]
+				else:
+					position = child
+				current = previous
+		nodes = {}
+		for item, end in reversed(order):
+			nodes[(item, end)] = self.make_node(item, end, charts, token_array, nodes)
+		return nodes[(root, len(token_array))]
+
+	def make_node(self, item, end, charts, token_array, nodes):
+		"""Returns the "Parse_Node" of the complete item "item" of the set of position "end", given the nodes
+		of its children."""
+		rule = item[0]
+		children = []
+		position = end
+		current = item
+		while current[1] > 0:
+			previous, child = charts[position][current]
+			if not isinstance(child, int):
+				children.append(nodes[(child, position)])
+				position = child[2]
+			else:
+				children.append(token_array[child])
+				position = child
+			current = previous
+		children.reverse()
+		return self.rule_node(rule, children)
+
+class Grammar_Analysis:
+	"""Computes the FIRST and FOLLOW sets of the rules originally given to a "CFG"."""
+
+	"""Each rule becomes a production (A, (B_1, ..., B_n), rule).  A "Dynamic_Rule" A -> ? becomes the production
+	(A, (rule,), rule), so that the rule itself serves as a terminal, which matches the tokens its match function
+	accepts.  "first[X]" is the set of terminals which can begin a string derived from X, and "follow[A]" the set
+	of terminals which can follow A in a string derived from the start variable, where None marks the end of the
+	string.  "nullable" is the set of variables which derive the empty string."""
+	def __init__(self, cfg):
+		self.cfg = cfg
+		self.productions = []
+		self.productions_of = {}
+		for rule in cfg.original_rules:
+			rhs = (rule,) if isinstance(rule, Dynamic_Rule) else tuple(rule.rhs)
+			self.productions_of.setdefault(rule.lhs, []).append(len(self.productions))
+			self.productions.append((rule.lhs, rhs, rule))
+		self.variables = set(self.productions_of)
+		self.terminals = {symbol for _, rhs, _ in self.productions for symbol in rhs if symbol not in self.variables}
+		self.nullable = set()
+		changed = True
+		while changed:
+			changed = False
+			for lhs, rhs, _ in self.productions:
+				if lhs not in self.nullable and all(symbol in self.nullable for symbol in rhs):
+					self.nullable.add(lhs)
+					changed = True
+		self.first = {variable: set() for variable in self.variables}
+		changed = True
+		while changed:
+			changed = False
+			for lhs, rhs, _ in self.productions:
+				first, _ = self.first_of(rhs)
+				if not first <= self.first[lhs]:
+					self.first[lhs] |= first
+					changed = True
+		self.follow = {variable: set() for variable in self.variables}
+		self.follow[cfg.start_token].add(None)
+		changed = True
+		while changed:
+			changed = False
+			for lhs, rhs, _ in self.productions:
+				for n, symbol in enumerate(rhs):
+					if symbol not in self.variables:
+						continue
+					follow, nullable = self.first_of(rhs[n+1:])
+					if nullable:
+						follow = follow | self.follow[lhs]
+					if not follow <= self.follow[symbol]:
+						self.follow[symbol] |= follow
+						changed = True
+
+	def first_of(self, symbols):
+		"""Returns the pair (set of terminals which can begin a string derived from "symbols", whether "symbols"
+		derives the empty string)."""
+		first = set()
+		for symbol in symbols:
+			if symbol not in self.variables:
+				first.add(symbol)
+				return first, False
+			first |= self.first[symbol]
+			if symbol not in self.nullable:
+				return first, False
+		return first, True
+
+	def ll1_conflicts(self):
+		"""Returns a list describing the pairs of rules for the same variable which an LL(1) parser could not choose
+		between; the rules are LL(1) iff it is empty."""
+		conflicts = []
+		for variable, numbers in self.productions_of.items():
+			seen = {}
+			for number in numbers:
+				first, nullable = self.first_of(self.productions[number][1])
+				if nullable:
+					first = first | self.follow[variable]
+				for symbol in first:
+					if symbol in seen:
+						conflicts.append("LL(1) conflict on " + symbol_name(symbol) + " between " + str(self.productions[seen[symbol]][2]) + " and " + str(self.productions[number][2]))
+					else:
+						seen[symbol] = number
+		return conflicts
+
+class LALR_Parser(Original_Rules_Parser):
+	"""Converts sequence of tokens into tree of "Parse_Node"s in linear time, if the rules given to a "CFG" are LALR(1)."""
+
+	"""The parse table is built by constructing the sets of LR(1) items and merging those with the same LR(0) items
+	as they are found.  "actions[s]" maps each terminal (see "Grammar_Analysis") or None, marking the end of the
+	tokens, to ("shift", state) or ("reduce", production number), and "gotos[s]" maps each variable to a state.
+	If the rules are not LALR(1), "conflicts" describes the conflicts, which are resolved in favour of shifting
+	and of the rule given first, and the trees built may not be the only ones.  Whether a token matches several
+	"Dynamic_Rule"s is only known once it is read: if their actions differ, the conflict is added to "conflicts"
+	and "AmbiguousTokenError" is raised, so that the caller can fall back to a general parser."""
+	def __init__(self, cfg):
+		super().__init__(cfg)
+		self.analysis = Grammar_Analysis(cfg)
+		productions = self.analysis.productions
+		self.dynamic_terminals = [rule for rule in cfg.original_rules if isinstance(rule, Dynamic_Rule)]
+		# A state is represented by its kernel, which maps each item (production number, position of dot) to the
+		# set of its lookaheads
+		kernels = [{(number, 0): {None} for number in self.analysis.productions_of[cfg.start_token]}]
+		numbers = {frozenset(kernels[0]): 0}
+		transitions = [{}]
+		worklist = [0]
+		while len(worklist) > 0:
+			state = worklist.pop()
+			successors = {}
+			for (number, dot), lookaheads in self.closure(kernels[state]).items():
+				rhs = productions[number][1]
+				if dot < len(rhs):
+					successors.setdefault(rhs[dot], {}).setdefault((number, dot + 1), set()).update(lookaheads)
+			for symbol, kernel in successors.items():
+				core = frozenset(kernel)
+				if core not in numbers:
+					numbers[core] = len(kernels)
+					kernels.append(kernel)
+					transitions.append({})
+					worklist.append(numbers[core])
+				else:
+					target = kernels[numbers[core]]
+					changed = False
+					for item, lookaheads in kernel.items():
+						if not lookaheads <= target[item]:
+							target[item] |= lookaheads
+							changed = True
+					if changed and numbers[core] not in worklist:
+						worklist.append(numbers[core])
+				transitions[state][symbol] = numbers[core]
+		self.actions = []
+		self.gotos = []
+		self.conflicts = []
+		for state, kernel in enumerate(kernels):
+			actions = {}
+			gotos = {}
+			for symbol, target in transitions[state].items():
+				if symbol in self.analysis.variables:
+					gotos[symbol] = target
+				else:
+					actions[symbol] = ("shift", target)
+			for (number, dot), lookaheads in sorted(self.closure(kernel).items()):
+				if dot < len(productions[number][1]):
+					continue
+				for lookahead in lookaheads:
+					if lookahead in actions:
+						self.conflicts.append(self.describe_conflict(state, lookahead, actions[lookahead], number))
+					else:
+						actions[lookahead] = ("reduce", number)
+			self.actions.append(actions)
+			self.gotos.append(gotos)
+
+	def closure(self, kernel):
+		"""Returns the LR(1) items, with their lookaheads, of the state with kernel "kernel"."""
+		productions = self.analysis.productions
+		items = {item: set(lookaheads) for item, lookaheads in kernel.items()}
+		worklist = list(items)
+		while len(worklist) > 0:
+			number, dot = worklist.pop()
+			rhs = productions[number][1]
+			if dot == len(rhs) or rhs[dot] not in self.analysis.variables:
+				continue
+			lookaheads, nullable = self.analysis.first_of(rhs[dot+1:])
+			if nullable:
+				lookaheads = lookaheads | items[(number, dot)]
+			for new_number in self.analysis.productions_of[rhs[dot]]:
+				item = (new_number, 0)
+				if item not in items:
+					items[item] = set(lookaheads)
+					worklist.append(item)
+				elif not lookaheads <= items[item]:
+					items[item] |= lookaheads
+					worklist.append(item)
+		return items
+
+	def describe_conflict(self, state, lookahead, action, number):
+		rule = self.analysis.productions[number][2]
+		if action[0] == "shift":
+			description = "shift-reduce conflict"
+		else:
+			description = "reduce-reduce conflict with " + str(self.analysis.productions[action[1]][2])
+		return "LALR(1) " + description + " on " + symbol_name(lookahead) + " in state " + str(state) + " for " + str(rule)
+
+	def action(self, state, token):
+		"""Returns the action of the parser in state "state" on the next token "token" (None if there is none), or
+		None if "token" cannot come next."""
+		actions = self.actions[state]
+		if token == None:
+			return actions.get(None)
+		action = actions.get(token)
+		if action != None:
+			return action
+		matches = [rule for rule in self.dynamic_terminals if rule in actions and rule.match_function(token, [])]
+		if len(matches) == 0:
+			return None
+		if any(actions[rule] != actions[matches[0]] for rule in matches):
+			conflict = "LALR(1) conflict on " + str(token) + " in state " + str(state) + " between " + ", ".join(str(rule) for rule in matches)
+			if conflict not in self.conflicts:
+				self.conflicts.append(conflict)
+			raise AmbiguousTokenError(conflict)
+		return actions[matches[0]]
+
+	def parse_one(self, token_array):
+		"""Returns the root of the derivation tree for the list of tokens, or None if there is none."""
+		if len(token_array) == 0:
+			raise EmptyError
+		productions = self.analysis.productions
+		states = [0]
+		nodes = []
+		position = 0
+		while True:
+			token = token_array[position] if position < len(token_array) else None
+			action = self.action(states[-1], token)
+			if action == None:
+				return None
+			if action[0] == "shift":
+				states.append(action[1])
+				nodes.append(token)
+				position += 1
+				continue
+			lhs, rhs, rule = productions[action[1]]
+			children = nodes[len(nodes) - len(rhs):]
+			del nodes[len(nodes) - len(rhs):]
+			del states[len(states) - len(rhs):]
+			if isinstance(rule, Dynamic_Rule):
+				node = Parse_Node(lhs, children, rule)
+			else:
+				node = self.rule_node(rule, children)
+			if lhs == self.cfg.start_token:
+				return node
+			states.append(self.gotos[states[-1]][lhs])
+			nodes.append(node)
+
+	def recognize(self, token_array):
+		"""Returns whether the list of tokens can be derived from the start variable."""
+		return self.parse_one(token_array) != None
+
+def symbol_name(symbol):
+	"""Returns a description of a terminal or variable as used in "Grammar_Analysis"."""
+	if symbol == None:
+		return "end of input"
+	if isinstance(symbol, Dynamic_Rule):
+		return "tokens matching " + str(symbol)
+	return "'" + str(symbol) + "'"
+
+def bitset_cell(i, row, column, pair_rules, right_masks):
+	"""Returns the pair (mask, back-pointers) of the cell for w_i...w_(i+l-1) of the bitset chart of "CFG_Parser", \
+	where row[m] and column[m] are the masks of the cells for w_i...w_(i+m) and w_(i+m+1)...w_(i+l-1).  The \
+	back-pointers hold the rules as they are given in "pair_rules": "Rule"s in the calling process, and their \
+	numbers in the processes of "fill_bitset_chart_parallel", to which they are passed by pickling."""
+	mask = 0
+	pointers = {}
+	for m, prefix in enumerate(row):
+		if prefix == 0:
+			continue
+		suffix = column[m]
+		if suffix == 0:
+			continue
+		while prefix:
+			low_bit = prefix & -prefix
+			prefix ^= low_bit
+			left = low_bit.bit_length() - 1
+			if right_masks[left] & suffix == 0:
+				continue
+			for right_bit, lhs_bit, rule in pair_rules[left]:
+				if suffix & right_bit and not mask & lhs_bit:
+					mask |= lhs_bit
+					pointers[lhs_bit.bit_length() - 1] = (i+m+1, rule)
+	return mask, pointers
+
+# The shared chart and rules of a process started by "CFG_Parser.fill_bitset_chart_parallel"
+bitset_worker = {}
+
+def start_bitset_worker(name, words, length, pair_rules, right_masks):
+	from multiprocessing import shared_memory
+	memory = shared_memory.SharedMemory(name = name)
+	rows = memory.buf.cast("Q")
+	bitset_worker.update(memory = memory, rows = rows, columns = rows[length * length * words:], words = words,
+		length = length, pair_rules = pair_rules, right_masks = right_masks)
+
+def read_masks(words, start, count, array):
+	"""Returns the list of "count" masks stored in "array" from the "start"-th on, each as "words" words."""
+	values = array[start * words:(start + count) * words].tolist()
+	if words == 1:
+		return values
+	return [sum(values[n * words + word] << (64 * word) for word in range(words)) for n in range(count)]
+
+def fill_bitset_cells(task):
+	"""Returns the list of pairs (mask, back-pointers) of the cells for w_i...w_(i+l-1), where first <= i < last \
+	and task = (l, first, last)."""
+	l, first, last = task
+	words = bitset_worker["words"]
+	length = bitset_worker["length"]
+	cells = []
+	for i in range(first, last):
+		row = read_masks(words, i * length + i, l - 1, bitset_worker["rows"])
+		column = read_masks(words, (i+l-1) * length + i + 1, l - 1, bitset_worker["columns"])
+		cells.append(bitset_cell(i, row, column, bitset_worker["pair_rules"], bitset_worker["right_masks"]))
+	return cells
 
 class Parse_Node:
 	""" Represents a derivation yielded by a rule of the form A -> BC."""
@@ -356,9 +1178,11 @@ class Parse_Node:
 			return str(self.rhs[0])
 
 	def __eq__(self, other):
+		# Derivations of the same tokens by rules evaluating them differently, such as "Dynamic_Rule"s matching
+		# the same token, are different trees
 		if not isinstance(other, Parse_Node):
 			return False
-		return self.lhs == other.lhs and self.rhs == other.rhs
+		return self.lhs == other.lhs and self.rhs == other.rhs and self.rule.evaluation is other.rule.evaluation
 
 	def __hash__(self):
 		if len(self.rhs) == 1:
@@ -366,6 +1190,114 @@ class Parse_Node:
 		else:
 			return hash((self.lhs, self.rhs[0], self.rhs[1]))
 
+class Forest_Node:
+	"""Represents all derivations from the variable "lhs" of the tokens w_start...w_end."""
+
+	"""If start = end, each packing is a "Parse_Node" representing the token; otherwise each packing is a triple
+	(A -> BC, L, R), where L and R are the "Forest_Node"s of B and C for adjacent substrings.  "count", the
+	number of derivations, is set by the "Parse_Forest" containing the node."""
+	def __init__(self, lhs, start, end):
+		self.lhs = lhs
+		self.start = start
+		self.end = end
+		self.packings = []
+		self.count = None
+
+	def is_leaf(self):
+		return self.start == self.end
+
+	def packing_count(self, packing):
+		if self.is_leaf():
+			return 1
+		return packing[1].count * packing[2].count
+
+	def choose(self, index, packings = None):
+		"""Returns the pair (packing, index within packing) of the derivation numbered "index", numbering the \
+		derivations in the order of "packings" (by default, "packings" of the node)."""
+		for packing in self.packings if packings == None else packings:
+			count = self.packing_count(packing)
+			if index < count:
+				return packing, index
+			index -= count
+		raise IndexError(index)
+
+	def __repr__(self):
+		return str(self.lhs) + "[" + str(self.start) + ":" + str(self.end + 1) + "]"
+
+class Parse_Forest:
+	"""A shared packed parse forest: the derivation trees of a list of tokens, numbered 0, ..., count-1."""
+
+	"""Iterating over the forest yields the trees as "Parse_Node"s in order of their numbers, building each only
+	when it is reached; "tree" builds the tree with a given number.  If "priority" is given, the packings of each
+	node are ordered by priority(rule) (for leaves, the rule yielding the token), so that tree 0 is the tree
+	which prefers rules with smaller keys, from the root down.  The ordered packings are kept by the forest in
+	"packings", keyed by the id of the node, since the nodes may be shared with other forests."""
+	def __init__(self, root, priority = None):
+		self.root = root
+		self.count = 0
+		self.packings = {}
+		if root == None:
+			return
+		# Count derivations from the leaves up, visiting each shared node once
+		order = []
+		visited = {id(root)}
+		stack = [root]
+		while len(stack) > 0:
+			node = stack.pop()
+			order.append(node)
+			if not node.is_leaf():
+				for _, left, right in node.packings:
+					for child in [left, right]:
+						if id(child) not in visited:
+							visited.add(id(child))
+							stack.append(child)
+		order.sort(key = lambda node: node.end - node.start)
+		for node in order:
+			if priority != None:
+				if node.is_leaf():
+					self.packings[id(node)] = sorted(node.packings, key = lambda packing: priority(packing.rule))
+				else:
+					self.packings[id(node)] = sorted(node.packings, key = lambda packing: priority(packing[0]))
+			node.count = sum(node.packing_count(packing) for packing in node.packings)
+		self.count = root.count
+
+	def tree(self, index = 0):
+		"""Returns the derivation tree numbered "index"."""
+		if not 0 <= index < self.count:
+			raise IndexError(index)
+		# List the chosen derivations from the root down, each before its left and then its right subtree;
+		# in reverse, every derivation comes after those of its children
+		order = []
+		stack = [(self.root, index)]
+		while len(stack) > 0:
+			node, index = stack.pop()
+			packing, index = node.choose(index, self.packings.get(id(node)))
+			order.append(packing)
+			if not node.is_leaf():
+				_, left, right = packing
+				stack.append((right, index % right.count))
+				stack.append((left, index // right.count))
+		trees = []
+		for packing in reversed(order):
+			if isinstance(packing, Parse_Node):
+				trees.append(packing)
+			else:
+				rule = packing[0]
+				left = trees.pop()
+				right = trees.pop()
+				trees.append(Parse_Node(rule.lhs, [left, right], rule))
+		return trees[0]
+
+	def __iter__(self):
+		for index in range(self.count):
+			yield self.tree(index)
+
+	def __bool__(self):
+		return self.count > 0
+
+	def __repr__(self):
+		return "Parse_Forest(" + str(self.root) + ", " + str(self.count) + " derivations)"
+
 class Token:
 	"""Represents a variable in the CFG's rule-set"""
 	number = 0
@@ -446,3 +1378,7 @@ class Rule_Conversion:
 class InvalidRuleError(Exception):
 	def __init__(self, rule):
 		self.message = "Invalid rule: " + str(rule)
+
+class AmbiguousTokenError(Exception):
+	def __init__(self, conflict):
+		self.message = conflict
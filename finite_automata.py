@@ -1,8 +1,37 @@
 from itertools import chain
-import unittest
+from array import array
+from bisect import bisect_left, bisect_right
 
 epsilon = None
 
+class Char_Range:
+	"""Represents the set of characters whose code points lie between those of "first" and "last", inclusive.  \
+	A "Char_Range" may be used wherever a single character may label a transition or belong to an alphabet, so \
+	that large alphabets (e.g., all of Unicode) need not be enumerated character by character."""
+	def __init__(self, first, last):
+		self.first = first
+		self.last = last
+
+	def __contains__(self, char):
+		return self.first <= char <= self.last
+
+	def __len__(self):
+		return ord(self.last) - ord(self.first) + 1
+
+	def __lt__(self, other):
+		return (self.first, self.last) < (other.first, other.last)
+
+	def __eq__(self, other):
+		if not isinstance(other, Char_Range):
+			return False
+		return self.first == other.first and self.last == other.last
+
+	def __hash__(self):
+		return hash((self.first, self.last))
+
+	def __repr__(self):
+		return "[" + self.first + "-" + self.last + "]"
+
 class State:
 	number = 0
 	def __init__(self, accepting = False, starting = False, token_type = None, dead_end = False):
@@ -30,13 +59,35 @@ class NFA_State(State):
 	""" Represents a possible state of an NFA.  Its transition function is a mapping from characters of the \
 	NFA's alphabet to sets of its states.  If c is mapped to {s_1, ..., s_n}, then an NFA which is in the \
 	current state and receives the character c as input can enter any of the states s_1, ..., s_n.  The value
-	None is mapped to the set of states reachable from the current state with one epsilon-move."""
+	None is mapped to the set of states reachable from the current state with one epsilon-move.  "version" \
+	counts the changes to the transitions and acceptance of all "NFA_State"s, since states may be shared by \
+	several NFAs, each of which can tell from it whether what it has computed from its states is out of date."""
+	version = 0
+
+	@property
+	def accepting(self):
+		return self.is_accepting
+
+	@accepting.setter
+	def accepting(self, accepting):
+		self.is_accepting = accepting
+		NFA_State.version += 1
+
 	def add_transition(self, input_char, state):
+		NFA_State.version += 1
 		if input_char in self.transition:
 			self.transition[input_char].add(state)
 		else:
 			self.transition[input_char] = {state}
 
+	def targets(self, char):
+		"""Returns the set of states the NFA can reach in one hop from the current state on input "char"."""
+		targets = set()
+		for input_char, states in self.transition.items():
+			if input_char == char or (isinstance(input_char, Char_Range) and char in input_char):
+				targets |= states
+		return targets
+
 	def get_epsilon_neighbors(self):
 		"""Returns the set of states the NFA can reach in one hop from the current state without receiving any input.""" 
 		if None in self.transition:
@@ -54,9 +105,29 @@ class NFA_State(State):
 		return self.accepting
 
 class DFA_State(State):
+	"""Represents a state of a DFA.  Its transition function maps characters and pairwise disjoint "Char_Range"s \
+	to states; the ranges are also kept sorted by their first character so that they can be searched by bisection."""
+	def __init__(self, accepting = False, starting = False, token_type = None, dead_end = False):
+		super().__init__(accepting = accepting, starting = starting, token_type = token_type, dead_end = dead_end)
+		self.ranges = []
+		self.range_starts = []
+
 	def add_transition(self, input_char, state):
+		if isinstance(input_char, Char_Range) and input_char not in self.transition:
+			index = bisect_left(self.range_starts, input_char.first)
+			self.ranges.insert(index, input_char)
+			self.range_starts.insert(index, input_char.first)
 		self.transition[input_char] = state
 
+	def next_state(self, char):
+		"""Returns the state the DFA enters from the current state on input "char", or None if there is none."""
+		state = self.transition.get(char)
+		if state == None and len(self.ranges) > 0:
+			index = bisect_right(self.range_starts, char) - 1
+			if index >= 0 and char <= self.ranges[index].last:
+				return self.transition[self.ranges[index]]
+		return state
+
 	def __repr__(self):
 		mark = "?"
 		if self.accepting:
@@ -67,7 +138,9 @@ class DFA_State(State):
 
 class NFA:
 	""" Represents a non-deterministic finite automaton.  It is defined by its alphabet, transition function, and \
-	set of states, one of which is the starting state and some of which are accepting states."""
+	set of states, one of which is the starting state and some of which are accepting states.  If "char_type" is \
+	given, the NFA recognizes the sequence of its elements, each of which is a character, a "Char_Range", or a \
+	set of characters and "Char_Range"s matching any one of its members."""
 	def __init__(self, alphabet, start_state = None, char_type = "", token_type = None):
 		self.alphabet = alphabet
 		self.accepting_states = set()
@@ -76,9 +149,14 @@ class NFA:
 		else:
 			self.start_state = start_state
 		self.states = [self.start_state]
+		self.lazy_dfa = None
 		for char in char_type:
 			self.states.append( NFA_State() )
-			self.states[-2].add_transition(char, self.states[-1])
+			if isinstance(char, (set, frozenset)):
+				for symbol in char:
+					self.states[-2].add_transition(symbol, self.states[-1])
+			else:
+				self.states[-2].add_transition(char, self.states[-1])
 		if len(char_type) > 0:
 			self.states[-1].accepting = True
 			self.states[-1].token_type = {token_type}
@@ -92,6 +170,7 @@ class NFA:
 	def merge_states(self, s1, s2): #will modify self
 		"""Merges the states s1 and s2 assuming there is an epsilon-transition between s1 and s2"""
 		combined_state = NFA_State()
+		NFA_State.version += 1
 		self.states.remove(s1)
 		self.states.remove(s2)
 		self.states.append(combined_state)
@@ -112,7 +191,8 @@ class NFA:
 			else:
 				combined_state.transition[input_char] = s2.transition[input_char]
 		if s2 in self.accepting_states:
-			self.combined_state.token_type = s2.token_type
+			combined_state.accepting = True
+			combined_state.token_type = s2.token_type
 			self.accepting_states.remove(s2)
 			self.accepting_states.add(combined_state)
 
@@ -153,14 +233,19 @@ class NFA:
 				token_type |= state.token_type
 			else:
 				state.token_type = {new_token_type}
-		nfa.start_state.accepting = True
-		nfa.accepting_states.add(nfa.start_state)
-		nfa.start_state.token_type = token_type
+		# A new start state accepts the empty string; making the old one accepting would also accept any
+		# string leading back to it
+		new_start_state = NFA_State(accepting = True, starting = True, token_type = token_type)
+		new_start_state.add_transition(epsilon, nfa.start_state)
+		nfa.start_state.starting = False
+		nfa.start_state = new_start_state
+		nfa.states.insert(0, new_start_state)
+		nfa.accepting_states.add(new_start_state)
 		return nfa
 
 	def complement_NFA(nfa):
 		complementary_nfa = NFA(nfa.alphabet)
-		complementary_nfa.states = nfa.convert().complement_DFA().convert_states()
+		complementary_nfa.states = list(nfa.convert().complement_DFA().convert_states())
 		complementary_nfa.accepting_states = {s for s in complementary_nfa.states if s}
 		for state in [s for s in complementary_nfa.states if s.starting]:
 			complementary_nfa.start_state = state
@@ -168,47 +253,49 @@ class NFA:
 
 	def e_closure(self, starting_states):
 		"""Returns all states which can be reached from some state in starting_states along epsilon-paths (i.e., without any input)."""
-		reachable_states = []
-		frontier_states = starting_states
-		while (len(frontier_states) > 0):
-			reachable_states += frontier_states
-			new_states = chain(*[state.get_epsilon_neighbors() for state in frontier_states])
-			frontier_states = [s for s in new_states if s not in reachable_states]
+		reachable_states = set(starting_states)
+		frontier_states = list(reachable_states)
+		while len(frontier_states) > 0:
+			for state in frontier_states.pop().get_epsilon_neighbors():
+				if state not in reachable_states:
+					reachable_states.add(state)
+					frontier_states.append(state)
 		return frozenset(reachable_states)
 
 	def states_after_move(self, states, char):
-		next_states = [ state.transition[char] for state in filter(lambda state: char in state.transition, states) ]
+		next_states = [ state.targets(char) for state in states ]
 		return self.e_closure( set(chain(*next_states)) )
 
-	def move(self, char):
-		self.possible_states = self.states_after_move(self.possible_states, char)
-
 	def convert(self):
 		"""Returns an equivalent DFA (i.e., one which recognizes the same language)"""
 		dfa = DFA(self.alphabet)
-		trans = Translation(dfa)
-		starting_states = self.e_closure([self.start_state])
-		dfa.set_start_state( trans.translate(starting_states).dfa_state )
-		active_states = {starting_states}
+		bitset_nfa = Bitset_NFA(self)
+		trans = Translation(dfa, bitset_nfa)
+		dfa.set_start_state( trans.translate(bitset_nfa.start).dfa_state )
+		active_states = [bitset_nfa.start]
 		while len(active_states) > 0:
 			nfa_states = active_states.pop()
 			old_dfa_state = trans.translate(nfa_states).dfa_state
-			for char in self.alphabet:
-				new_states = self.states_after_move(nfa_states, char)
+			moves = bitset_nfa.moves(nfa_states)
+			for char, new_states in moves.items():
 				result = trans.translate(new_states)
 				old_dfa_state.add_transition(char, result.dfa_state)
 				if result.unvisited:
-					active_states.add(new_states)
+					active_states.append(new_states)
+			# Characters which appear on no outgoing transition lead to the dead end
+			for char in bitset_nfa.alphabet:
+				if char not in moves:
+					old_dfa_state.add_transition(char, trans.dead_end)
 		return dfa
 
 	def is_valid(self, string):
-		"""Determines whether the NFA accepts the given list of symbols"""
-		self.possible_states = self.e_closure([self.start_state])
-		for char in string:
-			if char not in self.alphabet:
-				return False
-			self.move(char)
-		return any(self.possible_states)
+		"""Determines whether the NFA accepts the given list of symbols.  The "Lazy_DFA" simulating the NFA is \
+		kept in "lazy_dfa", so that later calls reuse the DFA states it has built, until a change to any \
+		"NFA_State" makes it out of date (see "NFA_State.version")."""
+		if self.lazy_dfa == None or self.lazy_dfa_version != NFA_State.version:
+			self.lazy_dfa = Lazy_DFA(self)
+			self.lazy_dfa_version = NFA_State.version
+		return self.lazy_dfa.is_valid(string)
 
 	def __repr__(self):
 		return "States:" + str([s.number for s in self.states]) + "\nStart: " + str(self.start_state.number) + "\n" + "\n".join([str(s) for s in self.states])
@@ -243,42 +330,205 @@ class DFA:
 	def is_valid(self, string):
 		self.current_state = self.start_state
 		for char in string:
-			self.current_state = self.current_state.transition[char]
+			self.current_state = self.current_state.next_state(char)
+			if self.current_state == None:
+				return False
 		return self.current_state.accepting
 
 	def scan(self, string):
 		"""Scans "string", whose symbols are drawn from "alphabet", and returns a list of matches.  \
 		If the string is s_1...s_n, and s_i...s_j is a match, then s_(j+1)...s_k will be in the list \
 		iff k is the largest integer such that the NFA accepts s_(j+1)...s_k."""
-		matches = []
+		return [DFA.Match(string[start:end], token_type) for start, end, token_type in self.scan_spans(string)]
+
+	def scan_spans(self, string):
+		"""Like "scan", but returns a list of triples (start, end, token_type), where string[start:end] is \
+		the matched text.  The tail of "string" is never copied, so the running time is linear in its length."""
+		spans = []
 		start_index = 0
 		while start_index < len(string):
-			best_match = self.longest_match(string[start_index:])
-			if best_match == None or len(best_match.string) == 0:
-				return matches
-			else:
-				matches.append(best_match)
-				start_index += len(best_match.string)
-		return matches
-
-	def longest_match(self, string):
-		best_match = None
+			end_index, state = self.longest_match_end(string, start_index)
+			if end_index == None:
+				return spans
+			spans.append((start_index, end_index, state.token_type))
+			start_index = end_index
+		return spans
+
+	def iter_scan(self, source, chunk_size = 65536):
+		"""Lazily yields the matches "scan" would return for the concatenation of the chunks of "source", which \
+		is a string, a file object opened in text mode, or an iterable of strings.  Only the text from the start \
+		of the current token up to the end of the current chunk is kept in memory."""
+		buffer = ""
+		token_start = 0
+		position = 0
+		current_state = self.start_state
+		best_end = None
+		best_state = None
+		for chunk in chain(read_chunks(source, chunk_size), [None]):
+			if chunk != None:
+				buffer = buffer[token_start:] + chunk
+				position -= token_start
+				if best_end != None:
+					best_end -= token_start
+				token_start = 0
+			while True:
+				if position < len(buffer):
+					char = buffer[position]
+					current_state = current_state.next_state(char)
+					if current_state == None:
+						raise InvalidCharacterError(char)
+					position += 1
+					if current_state:
+						best_end = position
+						best_state = current_state
+						continue
+					elif not current_state.is_dead_end():
+						continue
+				elif chunk != None:
+					# The current token may continue in the next chunk
+					break
+				if best_end == None:
+					return
+				yield DFA.Match(buffer[token_start:best_end], best_state.token_type)
+				token_start = best_end
+				position = best_end
+				current_state = self.start_state
+				best_end = None
+				best_state = None
+
+	def longest_match(self, string, start = 0):
+		end, state = self.longest_match_end(string, start)
+		if end == None:
+			return None
+		return DFA.Match(string[start:end], state.token_type)
+
+	def longest_match_end(self, string, start = 0):
+		"""Returns the pair (end, state), where string[start:end] is the longest valid substring beginning at \
+		"start" and "state" is the accepting state it leads to, or (None, None) if there is no such substring."""
+		best_end = None
+		best_state = None
 		current_state = self.start_state
-		for i in range(len(string)):
-			if string[i] not in current_state.transition:
-				raise InvalidCharacterError(string[i])
-			current_state = current_state.transition[string[i]]
+		for i in range(start, len(string)):
+			char = string[i]
+			current_state = current_state.next_state(char)
+			if current_state == None:
+				raise InvalidCharacterError(char)
 			if current_state:
-				best_match = DFA.Match(string[:i+1], current_state.token_type)
+				best_end = i + 1
+				best_state = current_state
 			elif current_state.is_dead_end():
-				return best_match
-		return best_match
+				break
+		return best_end, best_state
+
+	def minimize(self):
+		"""Returns an equivalent DFA with as few states as possible, using Hopcroft's partition refinement.  States \
+		are initially partitioned by whether they accept and by their token types, so that the resulting DFA \
+		scans every string exactly as this one does."""
+		states = [self.start_state]
+		numbering = {self.start_state: 0}
+		for state in states:
+			for target in state.transition.values():
+				if target not in numbering:
+					numbering[target] = len(states)
+					states.append(target)
+		symbols = set(chain(*[state.transition for state in states]))
+		# A missing transition is treated as a transition to a virtual sink state, numbered len(states)
+		sink = len(states)
+		inverse = {symbol: [[] for _ in range(sink + 1)] for symbol in symbols}
+		for symbol in symbols:
+			for number, state in enumerate(states):
+				if symbol in state.transition:
+					inverse[symbol][numbering[state.transition[symbol]]].append(number)
+				else:
+					inverse[symbol][sink].append(number)
+			inverse[symbol][sink].append(sink)
+		initial_blocks = {}
+		for number, state in enumerate(states):
+			token_type = frozenset(state.token_type) if state.token_type != None else frozenset()
+			initial_blocks.setdefault((bool(state.accepting), token_type), set()).add(number)
+		blocks = list(initial_blocks.values()) + [{sink}]
+		block_of = [0] * (sink + 1)
+		for block_number, block in enumerate(blocks):
+			for number in block:
+				block_of[number] = block_number
+		worklist = set(range(len(blocks)))
+		while len(worklist) > 0:
+			splitter = list(blocks[worklist.pop()])
+			for symbol in symbols:
+				touched = {}
+				for target in splitter:
+					for source in inverse[symbol][target]:
+						touched.setdefault(block_of[source], []).append(source)
+				for block_number, members in touched.items():
+					if len(members) == len(blocks[block_number]):
+						continue
+					new_block = set(members)
+					blocks[block_number] -= new_block
+					new_number = len(blocks)
+					blocks.append(new_block)
+					for number in new_block:
+						block_of[number] = new_number
+					if block_number in worklist or len(new_block) <= len(blocks[block_number]):
+						worklist.add(new_number)
+					else:
+						worklist.add(block_number)
+		dfa = DFA(self.alphabet, token_type = self.token_type)
+		new_states = {}
+		for block_number in sorted(set(block_of[:sink]), key = lambda b: min(blocks[b])):
+			representative = states[min(blocks[block_number])]
+			token_type = set(representative.token_type) if representative.token_type != None else None
+			dead_end = any(states[number].is_dead_end() for number in blocks[block_number])
+			new_states[block_number] = dfa.add_state(representative.accepting, token_type, dead_end = dead_end)
+		for block_number, new_state in new_states.items():
+			representative = states[min(blocks[block_number])]
+			for symbol, target in representative.transition.items():
+				new_state.add_transition(symbol, new_states[block_of[numbering[target]]])
+		dfa.set_start_state(new_states[block_of[0]])
+		return dfa
+
+	def compile(self):
+		"""Returns an equivalent "Compiled_DFA", whose transition function is stored in flat integer arrays."""
+		return Compiled_DFA(self)
+
+	def to_tuple(self):
+		"""Returns a representation of the DFA built only of tuples, strings, booleans and None, suitable for \
+		"marshal".  A "Char_Range" is represented by the pair of its first and last characters, and each state by \
+		the tuple (accepting, dead end, token types, transitions), where transitions lead to indices of states."""
+		numbering = {state: number for number, state in enumerate(self.states)}
+		def symbol_tuple(symbol):
+			if isinstance(symbol, Char_Range):
+				return (symbol.first, symbol.last)
+			return symbol
+		def token_type_tuple(token_type):
+			return None if token_type == None else tuple(sorted(token_type))
+		states = tuple(
+			(bool(state.accepting), state.is_dead_end(), token_type_tuple(state.token_type),
+			tuple((symbol_tuple(symbol), numbering[target]) for symbol, target in state.transition.items()))
+			for state in self.states)
+		alphabet = tuple(symbol_tuple(symbol) for symbol in self.alphabet)
+		return (states, numbering[self.start_state], alphabet, token_type_tuple(self.token_type))
+
+	def from_tuple(data):
+		"""Returns the DFA represented by "data" (see "to_tuple")."""
+		def symbol_from_tuple(symbol):
+			if isinstance(symbol, tuple):
+				return Char_Range(*symbol)
+			return symbol
+		states, start, alphabet, token_type = data
+		dfa = DFA({symbol_from_tuple(symbol) for symbol in alphabet}, token_type = None if token_type == None else set(token_type))
+		for accepting, dead_end, state_token_type, _ in states:
+			dfa.add_state(accepting, None if state_token_type == None else set(state_token_type), dead_end = dead_end)
+		for state, (_, _, _, transitions) in zip(dfa.states, states):
+			for symbol, target in transitions:
+				state.add_transition(symbol_from_tuple(symbol), dfa.states[target])
+		dfa.set_start_state(dfa.states[start])
+		return dfa
 
 	def convert_states(self):
 		translation = {state: NFA_State(accepting = state.accepting, starting = state.starting, token_type = state.token_type) for state in self.states}
 		for state in self.states:
-			for char in self.alphabet:
-				translation[state].add_transition( char, translation[state.transition[char]] )
+			for char, target in state.transition.items():
+				translation[state].add_transition( char, translation[target] )
 		return translation.values()
 
 	def complement_DFA(self):
@@ -289,28 +539,299 @@ class DFA:
 	def __repr__(self):
 		return "Start: " + str(self.start_state.number) + "\n" + "\n".join([str(s) for s in self.states])
 
+class Compiled_DFA:
+	"""A DFA whose transition function is stored as a dense table of integers.  Characters which every state \
+	treats identically share a character class; "classes" maps each character to its class, and the number of \
+	the state reached from state s on a character of class c is "table[s * class_count + c]" (-1 if there is \
+	no such transition).  The start state is always numbered 0."""
+	def __init__(self, dfa):
+		states = [dfa.start_state]
+		numbering = {dfa.start_state: 0}
+		for state in chain(dfa.states, states):
+			for target in chain([state], state.transition.values()):
+				if target not in numbering:
+					numbering[target] = len(states)
+					states.append(target)
+		# Characters whose columns of the transition table coincide are assigned the same class
+		columns = {}
+		self.classes = {}
+		ranges = {}
+		for char in set(chain(*[state.transition for state in states])):
+			column = tuple(numbering[state.transition[char]] if char in state.transition else -1 for state in states)
+			if column not in columns:
+				columns[column] = len(columns)
+			if isinstance(char, Char_Range):
+				ranges[char] = columns[column]
+			else:
+				self.classes[char] = columns[column]
+		# Characters not found in "classes" are looked up by bisection among the (disjoint) ranges
+		self.ranges = sorted(ranges)
+		self.range_starts = [char_range.first for char_range in self.ranges]
+		self.range_classes = [ranges[char_range] for char_range in self.ranges]
+		# Used when scanning bytes, each of which is read as the character with that code point
+		self.byte_classes = [self.char_class(chr(byte)) for byte in range(256)]
+		self.class_count = max(len(columns), 1)
+		self.table = array("i", [-1]) * (len(states) * self.class_count)
+		for column, char_class in columns.items():
+			for state_number, target in enumerate(column):
+				self.table[state_number * self.class_count + char_class] = target
+		self.accepting = bytes(bool(state.accepting) for state in states)
+		self.dead_end = bytes(state.is_dead_end() for state in states)
+		self.token_types = [frozenset(state.token_type) if state.token_type != None else None for state in states]
+
+	def scan(self, string):
+		"""Partitions "string" exactly as "DFA.scan" does, but returns a list of triples (start, end, token_type): \
+		the n^th match is string[start:end].  "string" may also be a bytes-like object, in which case it is \
+		scanned in place through a memoryview, each byte being read as a Latin-1 character."""
+		if isinstance(string, (bytes, bytearray, memoryview)):
+			string = memoryview(string).cast("B")
+			lookup = self.byte_classes.__getitem__
+		else:
+			lookup = self.classes.get
+		table = self.table
+		width = self.class_count
+		accepting = self.accepting
+		dead_end = self.dead_end
+		matches = []
+		length = len(string)
+		start = 0
+		while start < length:
+			state = 0
+			best_end = -1
+			i = start
+			while i < length:
+				char_class = lookup(string[i])
+				if char_class == None:
+					char_class = self.char_class(self.character(string[i]))
+					if char_class == None:
+						raise InvalidCharacterError(self.character(string[i]))
+				state = table[state * width + char_class]
+				if state < 0:
+					raise InvalidCharacterError(self.character(string[i]))
+				i += 1
+				if accepting[state]:
+					best_end = i
+					best_state = state
+				elif dead_end[state]:
+					break
+			if best_end < 0:
+				return matches
+			matches.append((start, best_end, self.token_types[best_state]))
+			start = best_end
+		return matches
+
+	def char_class(self, char):
+		char_class = self.classes.get(char)
+		if char_class == None and len(self.ranges) > 0:
+			index = bisect_right(self.range_starts, char) - 1
+			if index >= 0 and char <= self.ranges[index].last:
+				return self.range_classes[index]
+		return char_class
+
+	def character(self, symbol):
+		if isinstance(symbol, int):
+			return chr(symbol)
+		return symbol
+
+class Bitset_NFA:
+	"""Numbers the states reachable in an NFA densely, so that a set of them can be represented by an integer \
+	whose i^th bit is set iff the set contains the i^th state.  The epsilon-closure of each state, and the \
+	closure of the states it moves to on each character, are computed once."""
+	def __init__(self, nfa):
+		self.states = [nfa.start_state]
+		numbering = {nfa.start_state: 0}
+		for state in self.states:
+			for targets in state.transition.values():
+				for target in targets:
+					if target not in numbering:
+						numbering[target] = len(self.states)
+						self.states.append(target)
+		self.closures = []
+		for state in self.states:
+			mask = 0
+			for reachable_state in nfa.e_closure([state]):
+				mask |= 1 << numbering[reachable_state]
+			self.closures.append(mask)
+		# Characters and ranges are split into disjoint classes, which serve as the DFA's input symbols
+		symbols = set(nfa.alphabet)
+		for state in self.states:
+			symbols.update(char for char in state.transition if char != epsilon)
+		classes = partition_symbols(symbols)
+		self.alphabet = list(dict.fromkeys(chain(*[classes[char] for char in nfa.alphabet])))
+		self.ranges = sorted(char_class for char_class in self.alphabet if isinstance(char_class, Char_Range))
+		self.range_starts = [char_range.first for char_range in self.ranges]
+		self.chars = {char_class for char_class in self.alphabet if not isinstance(char_class, Char_Range)}
+		# transitions[i] maps each class c to the closure of the states the i^th state moves to on c
+		self.transitions = []
+		for state in self.states:
+			moves = {}
+			for char, targets in state.transition.items():
+				if char != epsilon:
+					mask = 0
+					for target in targets:
+						mask |= self.closures[numbering[target]]
+					for char_class in classes[char]:
+						moves[char_class] = moves.get(char_class, 0) | mask
+			self.transitions.append(moves)
+		self.accepting = 0
+		for number, state in enumerate(self.states):
+			if state:
+				self.accepting |= 1 << number
+		self.start = self.closures[0]
+
+	def members(self, mask):
+		"""Yields the numbers of the states in the set represented by "mask"."""
+		while mask:
+			lowest_bit = mask & -mask
+			yield lowest_bit.bit_length() - 1
+			mask ^= lowest_bit
+
+	def moves(self, mask):
+		"""Returns a dictionary mapping each character on which some state in "mask" has a transition to the \
+		(epsilon-closed) set of states reached on that character."""
+		moves = {}
+		for number in self.members(mask):
+			for char, targets in self.transitions[number].items():
+				moves[char] = moves.get(char, 0) | targets
+		return moves
+
+	def char_class(self, char):
+		"""Returns the class of the alphabet containing "char", or None if "char" is not in the alphabet."""
+		if char in self.chars:
+			return char
+		index = bisect_right(self.range_starts, char) - 1
+		if index >= 0 and char <= self.ranges[index].last:
+			return self.ranges[index]
+		return None
+
+	def move(self, mask, char_class):
+		"""Returns the (epsilon-closed) set of states reached from the states in "mask" on class "char_class"."""
+		new_mask = 0
+		for number in self.members(mask):
+			new_mask |= self.transitions[number].get(char_class, 0)
+		return new_mask
+
+	def token_type(self, mask):
+		return set(chain(*[self.states[number].token_type for number in self.members(mask & self.accepting)]))
+
+class Lazy_DFA:
+	"""Simulates the DFA equivalent to an NFA, constructing its states only as the input demands them.  Each \
+	state is a set of the NFA's states, represented as a bitmask (see "Bitset_NFA"), and the transitions \
+	computed so far are cached.  Once the cache holds more than "cache_size" transitions it is flushed; if \
+	that happens more than "max_flushes" times while testing one string, the rest of the string is handled \
+	by simulating the NFA directly, without caching."""
+	def __init__(self, nfa, cache_size = 10000, max_flushes = 8):
+		self.bitset_nfa = Bitset_NFA(nfa)
+		self.cache_size = cache_size
+		self.max_flushes = max_flushes
+		self.cache = {}
+		self.cached_transitions = 0
+		self.flushes = 0
+
+	def flush(self):
+		self.cache = {}
+		self.cached_transitions = 0
+		self.flushes += 1
+
+	def is_valid(self, string):
+		"""Determines whether the NFA accepts the given list of symbols"""
+		bitset_nfa = self.bitset_nfa
+		mask = bitset_nfa.start
+		flushes = 0
+		for char in string:
+			char_class = bitset_nfa.char_class(char)
+			if char_class == None:
+				return False
+			if flushes > self.max_flushes:
+				mask = bitset_nfa.move(mask, char_class)
+				continue
+			transitions = self.cache.get(mask)
+			if transitions == None:
+				transitions = self.cache[mask] = {}
+			if char_class in transitions:
+				mask = transitions[char_class]
+				continue
+			if self.cached_transitions >= self.cache_size:
+				self.flush()
+				flushes += 1
+				transitions = self.cache[mask] = {}
+			new_mask = bitset_nfa.move(mask, char_class)
+			transitions[char_class] = new_mask
+			self.cached_transitions += 1
+			mask = new_mask
+		return mask & bitset_nfa.accepting != 0
+
+	def __len__(self):
+		"""Returns the number of DFA states currently cached."""
+		return len(self.cache)
+
 class Translation:
 	class Result:
 		def __init__(self, dfa_state, unvisited):
 			self.dfa_state = dfa_state
 			self.unvisited = unvisited
 
-	def __init__(self, dfa):
+	def __init__(self, dfa, bitset_nfa):
 		self.dfa = dfa
+		self.bitset_nfa = bitset_nfa
 		self.dead_end = dfa.add_state(accepting = False, token_type = set(), dead_end = True)
-		for char in dfa.alphabet:
+		for char in bitset_nfa.alphabet:
 			self.dead_end.add_transition(char, self.dead_end)
-		self.nfa_to_dfa = { frozenset(): self.dead_end}
+		self.nfa_to_dfa = {0: self.dead_end}
 
 	def translate(self, states):
+		"""Returns the DFA state corresponding to the set of NFA states represented by the bitmask "states"."""
 		if states in self.nfa_to_dfa:
 			return Translation.Result(self.nfa_to_dfa[states], False)
 		else:
-			token_type = set(chain(*[s.token_type for s in states if s]))
-			new_state = self.dfa.add_state(accepting = any(states), token_type = token_type)
+			accepting = states & self.bitset_nfa.accepting != 0
+			new_state = self.dfa.add_state(accepting = accepting, token_type = self.bitset_nfa.token_type(states))
 			self.nfa_to_dfa[states] = new_state
 			return Translation.Result(new_state, True)
 
+def partition_symbols(symbols):
+	"""Splits the characters covered by "symbols", a collection of characters and "Char_Range"s, into the \
+	coarsest set of disjoint classes such that each symbol is a union of classes.  Returns a dictionary mapping \
+	each symbol to the list of those classes, in increasing order; a class consisting of a single character is \
+	represented by that character, and any other class by a "Char_Range"."""
+	intervals = {}
+	for symbol in symbols:
+		if isinstance(symbol, Char_Range):
+			intervals[symbol] = (ord(symbol.first), ord(symbol.last))
+		else:
+			intervals[symbol] = (ord(symbol), ord(symbol))
+	boundaries = sorted(set(chain(*[(first, last + 1) for first, last in intervals.values()])))
+	char_classes = {}
+	partition = {}
+	for symbol, (first, last) in intervals.items():
+		partition[symbol] = []
+		for index in range(bisect_left(boundaries, first), bisect_left(boundaries, last + 1)):
+			if index not in char_classes:
+				first_char = chr(boundaries[index])
+				last_char = chr(boundaries[index + 1] - 1)
+				if first_char == last_char:
+					char_classes[index] = first_char
+				else:
+					char_classes[index] = Char_Range(first_char, last_char)
+			partition[symbol].append(char_classes[index])
+	return partition
+
+def read_chunks(source, chunk_size):
+	"""Yields the non-empty chunks of "source", which is a string, a file object, or an iterable of strings."""
+	if isinstance(source, str):
+		if len(source) > 0:
+			yield source
+	elif hasattr(source, "read"):
+		while True:
+			chunk = source.read(chunk_size)
+			if len(chunk) == 0:
+				return
+			yield chunk
+	else:
+		for chunk in source:
+			if len(chunk) > 0:
+				yield chunk
+
 class InvalidCharacterError(Exception):
 	def __init__(self, char):
 		self.message = "The character " + char + " with ASCII code " + str(ord(char)) + " cannot be used."
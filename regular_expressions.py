@@ -1,6 +1,7 @@
 from finite_automata import *
 from context_free_grammars import *
 from functools import partial
+from collections import OrderedDict
 
 class Regular_Expression:
 	rules = [
@@ -20,24 +21,212 @@ class Regular_Expression:
 		None
 	]
 
-	def __init__(self, string, alphabet = None):
+	# CNF grammars for patterns are shared by all regular expressions over the same alphabet
+	parsers = {}
+
+	default_alphabet = frozenset(chr(i) for i in range(ord("a"), ord("c")+1))
+
+	def __init__(self, string, alphabet = None, engine = "thompson"):
+		"""Compiles the pattern "string".  With the default engine, a "Thompson_Compiler" builds the NFA directly;
+		with engine "cyk", the pattern is parsed with the general "CFG_Parser" and its parse tree evaluated."""
 		if alphabet == None:
-			alphabet = {chr(i) for i in range(ord("a"), ord("c")+1)}
-		letter_tokens = {Token(name = char, token_type = "terminal") for char in alphabet}
-		letter_rules = [["<letter>", token, lambda t: NFA(alphabet, char_type = t.name)] for token in letter_tokens]
-		rc = Rule_Conversion(Regular_Expression.rules, Regular_Expression.evaluations, additional_rules = letter_rules)
-		cfg = CFG(rc.get_converted_rules())
-		cfg.convert_rules_to_CNF()
-		parser = CFG_Parser(cfg)
-		interpretations = parser.parse([Token(name = s, token_type = "terminal") for s in string])
-		# Each token is precisely one character long; no scanner is necessary
-		if len(interpretations) == 0:
-			raise NoValidInterpretation(string)
-		# Choose an interpretation at random; it is up to the user to provide an unambiguous string
-		self.dfa = interpretations[0].unwind_tree().get_value().convert()
+			alphabet = Regular_Expression.default_alphabet
+		if engine == "thompson":
+			nfa = Thompson_Compiler(string, alphabet).compile()
+		elif engine == "cyk":
+			parser = Regular_Expression.get_parser(alphabet)
+			# Each token is precisely one character long; no scanner is necessary
+			interpretation = parser.parse_one([Token(name = s, token_type = "terminal") for s in string])
+			if interpretation == None:
+				raise NoValidInterpretation(string)
+			# Only the first derivation found is built; it is up to the user to provide an unambiguous string
+			nfa = interpretation.unwind_tree().get_value()
+		else:
+			raise ValueError("Unknown engine: " + str(engine))
+		self.nfa = nfa
+		self.dfa = None
+		# States of the equivalent DFA are only constructed as test strings reach them
+		self.lazy_dfa = Lazy_DFA(nfa)
+
+	def get_dfa(self):
+		"""Returns the full DFA for the pattern, which may have exponentially many states."""
+		if self.dfa == None:
+			self.dfa = self.nfa.convert()
+		return self.dfa
+
+	def get_parser(alphabet):
+		"""Returns the parser for patterns over "alphabet", building and converting its grammar on first use."""
+		key = frozenset(alphabet)
+		if key not in Regular_Expression.parsers:
+			letter_tokens = {Token(name = char, token_type = "terminal") for char in key}
+			letter_rules = [["<letter>", token, lambda t: NFA(set(key), char_type = t.name)] for token in letter_tokens]
+			rc = Rule_Conversion(Regular_Expression.rules, Regular_Expression.evaluations, additional_rules = letter_rules)
+			cfg = CFG(rc.get_converted_rules())
+			cfg.convert_rules_to_CNF()
+			Regular_Expression.parsers[key] = CFG_Parser(cfg)
+		return Regular_Expression.parsers[key]
 
 	def test(self, string):
-		return self.dfa.is_valid(string)
+		return self.lazy_dfa.is_valid(string)
+
+class Thompson_Compiler:
+	"""Compiles a pattern into an NFA by Thompson's construction, in time linear in the length of the pattern.
+	Postfix operators bind most tightly, then concatenation, then alternation:
+		<alternation> -> <concatenation> | <concatenation> "|" <alternation>
+		<concatenation> -> <postfix> | <postfix> <concatenation>
+		<postfix> -> <atom> | <postfix> "*" | <postfix> "^"
+		<atom> -> <letter> | "(" <alternation> ")"
+	A fragment of the NFA is the pair (start, accept) of its states.  The pattern is read from left to right
+	without recursion, so that the depth of nested parentheses is not limited by Python's recursion limit: the
+	stack "groups" holds, for the whole pattern and each open parenthesis, the list [alternation, concatenation,
+	postfix] of the fragments recognizing the alternatives before the last "|", the atoms before the last one,
+	and the last atom with its postfix operators, each of which is None if there is nothing to recognize."""
+	def __init__(self, string, alphabet):
+		self.string = string
+		self.alphabet = set(alphabet)
+		self.states = []
+
+	def compile(self):
+		groups = [[None, None, None]]
+		for char in self.string:
+			group = groups[-1]
+			if char == "(":
+				groups.append([None, None, None])
+			elif char == ")":
+				if len(groups) == 1:
+					raise NoValidInterpretation(self.string)
+				groups.pop()
+				self.add_atom(groups[-1], self.close_group(group))
+			elif char == "|":
+				group[0] = self.close_group(group)
+				group[1] = group[2] = None
+			elif char == "*" or char == "^":
+				if group[2] == None:
+					raise NoValidInterpretation(self.string)
+				group[2] = self.star(*group[2]) if char == "*" else self.complement(*group[2])
+			elif char in self.alphabet:
+				start = self.new_state()
+				accept = self.new_state()
+				start.add_transition(char, accept)
+				self.add_atom(group, (start, accept))
+			else:
+				raise NoValidInterpretation(self.string)
+		if len(groups) > 1:
+			raise NoValidInterpretation(self.string)
+		start, accept = self.close_group(groups[0])
+		start.starting = True
+		accept.accepting = True
+		accept.token_type = set()
+		nfa = NFA(self.alphabet, start_state = start)
+		nfa.states = self.states
+		nfa.accepting_states = {accept}
+		return nfa
+
+	def new_state(self):
+		state = NFA_State()
+		self.states.append(state)
+		return state
+
+	def add_atom(self, group, fragment):
+		"""Appends the fragment of an atom to the concatenation of "group"."""
+		if group[2] != None:
+			group[1] = self.concatenate(group[1], group[2])
+		group[2] = fragment
+
+	def close_group(self, group):
+		"""Returns the fragment recognizing the alternation of "group" up to its last atom."""
+		if group[2] == None:
+			raise NoValidInterpretation(self.string)
+		concatenation = self.concatenate(group[1], group[2])
+		if group[0] == None:
+			return concatenation
+		start, accept = group[0]
+		other_start, other_accept = concatenation
+		new_start = self.new_state()
+		new_accept = self.new_state()
+		new_start.add_transition(epsilon, start)
+		new_start.add_transition(epsilon, other_start)
+		accept.add_transition(epsilon, new_accept)
+		other_accept.add_transition(epsilon, new_accept)
+		return new_start, new_accept
+
+	def concatenate(self, first, second):
+		if first == None:
+			return second
+		first[1].add_transition(epsilon, second[0])
+		return first[0], second[1]
+
+	def star(self, start, accept):
+		new_start = self.new_state()
+		new_accept = self.new_state()
+		new_start.add_transition(epsilon, start)
+		new_start.add_transition(epsilon, new_accept)
+		accept.add_transition(epsilon, start)
+		accept.add_transition(epsilon, new_accept)
+		return new_start, new_accept
+
+	def complement(self, start, accept):
+		"""Returns a fragment recognizing the strings over the alphabet which the fragment (start, accept) rejects."""
+		accept.accepting = True
+		accept.token_type = set()
+		complementary_nfa = NFA.complement_NFA(NFA(self.alphabet, start_state = start))
+		accept.accepting = False
+		new_accept = self.new_state()
+		for state in complementary_nfa.states:
+			self.states.append(state)
+			state.starting = False
+			if state.accepting:
+				state.accepting = False
+				state.add_transition(epsilon, new_accept)
+		return complementary_nfa.start_state, new_accept
+
+class Pattern_Cache:
+	"""A least-recently-used cache of "Regular_Expression"s keyed by pattern, alphabet and engine, holding at most "size" \
+	of them.  "hits" and "misses" count the lookups which were and were not answered from the cache."""
+	def __init__(self, size = 128):
+		self.size = size
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, pattern, alphabet = None, engine = "thompson"):
+		if alphabet == None:
+			alphabet = Regular_Expression.default_alphabet
+		key = (pattern, frozenset(alphabet), engine)
+		if key in self.entries:
+			self.hits += 1
+			self.entries.move_to_end(key)
+			return self.entries[key]
+		self.misses += 1
+		regular_expression = Regular_Expression(pattern, alphabet, engine = engine)
+		self.entries[key] = regular_expression
+		self.evict()
+		return regular_expression
+
+	def resize(self, size):
+		self.size = size
+		self.evict()
+
+	def evict(self):
+		while len(self.entries) > self.size:
+			self.entries.popitem(last = False)
+
+	def clear(self):
+		self.entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __repr__(self):
+		return "Pattern_Cache(hits=%d, misses=%d, size=%d, length=%d)" % (self.hits, self.misses, self.size, len(self))
+
+pattern_cache = Pattern_Cache()
+
+def compile_pattern(pattern, alphabet = None, engine = "thompson"):
+	"""Returns a "Regular_Expression" for "pattern" over "alphabet", reusing a previously compiled one if possible."""
+	return pattern_cache.get(pattern, alphabet, engine)
 
 class NoValidInterpretation(Exception):
 	def __init__(self, string):
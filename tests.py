@@ -3,6 +3,11 @@ from context_free_grammars import *
 from untyped_lambda import *
 from regular_expressions import *
 import unittest
+import io
+import contextlib
+import os
+import tempfile
+import random
 
 class NFA_Test(unittest.TestCase):
 
@@ -35,6 +40,57 @@ class NFA_Test(unittest.TestCase):
 		self.assertFalse(dfa.is_valid("ababccca"))
 		self.assertFalse(dfa.is_valid("ccca"))
 
+	def test_compiled_scanner(self):
+		dfa = Lambda_Calculus.scanner
+		compiled = dfa.compile()
+		for string in ["plus 1 23", "λf.λx.f (f x)", "f := fix fac", "abc::=(x)", ""]:
+			expected = [(m.string, m.token_type) for m in dfa.scan(string)]
+			self.assertEqual([(string[start:end], token_type) for start, end, token_type in compiled.scan(string)], expected)
+		self.assertRaises(InvalidCharacterError, compiled.scan, "ab#")
+		self.assertEqual(compiled.scan(b"f (x y) := 12"), compiled.scan("f (x y) := 12"))
+		self.assertEqual(dfa.scan_spans("f (x y) := 12"), compiled.scan("f (x y) := 12"))
+
+	def test_iter_scan(self):
+		dfa = Lambda_Calculus.scanner
+		string = "plus 12 (λf.λx.f x) := abc 7"
+		expected = [(m.string, m.token_type) for m in dfa.scan(string)]
+		for size in range(1, 6):
+			chunks = [string[i:i+size] for i in range(0, len(string), size)]
+			self.assertEqual([(m.string, m.token_type) for m in dfa.iter_scan(chunks)], expected)
+		self.assertEqual([(m.string, m.token_type) for m in dfa.iter_scan(io.StringIO(string), chunk_size = 4)], expected)
+		lc = Lambda_Calculus()
+		self.assertEqual(list(lc.tokenize(io.StringIO(string))), list(lc.tokenize(string)))
+
+	def test_minimize(self):
+		letters = NFA.close_NFA(NFA.join_NFAs([NFA({c}, char_type = c) for c in "abc"]), new_token_type = "variable")
+		specials = [NFA(set(s), char_type = s, token_type = "special symbol") for s in ["(", ")", ":="]]
+		dfa = NFA.join_NFAs([letters] + specials).convert()
+		minimal = dfa.minimize()
+		self.assertLess(len(minimal.states), len(dfa.states))
+		self.assertEqual(len(minimal.minimize().states), len(minimal.states))
+		for string in ["abc(a):=", "((cab", "a:=b", ":=:=", "ca:"]:
+			self.assertEqual([(m.string, m.token_type) for m in minimal.scan(string)], [(m.string, m.token_type) for m in dfa.scan(string)])
+
+	def test_char_ranges(self):
+		letters = [Char_Range("a", "z"), Char_Range("A", "Z"), Char_Range("À", "ÿ"), Char_Range("α", "ω"), Char_Range("一", "鿿")]
+		identifiers = NFA.close_NFA(NFA(set(letters), char_type = [set(letters)]), new_token_type = "identifier")
+		digit = Char_Range("0", "9")
+		numbers = NFA.close_NFA(NFA({digit}, char_type = [digit]), new_token_type = "number")
+		space = NFA({" "}, char_type = " ", token_type = "space")
+		dfa = NFA.join_NFAs([identifiers, numbers, space]).convert().minimize()
+		string = "héllo Wörld 42 λογος 漢字"
+		self.assertEqual([(m.string, m.token_type) for m in dfa.scan(string)], [
+			("héllo", {"identifier"}), (" ", {"space"}), ("Wörld", {"identifier"}), (" ", {"space"}), ("42", {"number"}),
+			(" ", {"space"}), ("λογος", {"identifier"}), (" ", {"space"}), ("漢字", {"identifier"})
+		])
+		self.assertEqual(dfa.compile().scan(string), dfa.scan_spans(string))
+		self.assertRaises(InvalidCharacterError, dfa.scan, "ab#")
+		anything = Char_Range("\x00", "\U0010ffff")
+		nfa = NFA.concatenate_NFAs(NFA({anything}, char_type = [anything]), NFA({"a"}, char_type = "a"))
+		self.assertTrue(nfa.is_valid("😀a"))
+		self.assertTrue(nfa.convert().is_valid("😀a"))
+		self.assertFalse(nfa.convert().is_valid("😀"))
+
 	def test_re(self):
 		re = Regular_Expression("(ab)*c")
 		self.assertFalse(re.test("abab"))
@@ -52,6 +108,246 @@ class NFA_Test(unittest.TestCase):
 		self.assertFalse(re.test("aaa"))
 		self.assertTrue(re.test("b"))
 
+	def test_re_engines(self):
+		patterns = ["(ab)*c", "((a*)(b*)c)*", "(bab)|(abb)", "(a*)^", "((a|b)*)(c^)", "(((ab)^)|c)*"]
+		strings = [""]
+		for _ in range(5):
+			strings += [string + char for string in strings if len(string) == len(strings[-1]) for char in "abc"]
+		for pattern in patterns:
+			thompson = Regular_Expression(pattern)
+			cyk = Regular_Expression(pattern, engine = "cyk")
+			for string in strings:
+				self.assertEqual(thompson.test(string), cyk.test(string), (pattern, string))
+		re = Regular_Expression("ab*|c*")
+		self.assertTrue(re.test("abbb"))
+		self.assertTrue(re.test("ccc"))
+		self.assertFalse(re.test("abab"))
+		self.assertTrue(Regular_Expression("(" * 100 + "a" + ")*" * 100).test("aaa"))
+		self.assertRaises(NoValidInterpretation, Regular_Expression, "(ab")
+		deep = Regular_Expression("(" * 5000 + "a|b" + ")" * 5000 + "*")
+		self.assertTrue(deep.test("abba"))
+		self.assertFalse(deep.test("abc"))
+		for pattern in ["", "()", "a|", "|a", "*a", "a)", "(a", "a(|b)", "ad"]:
+			self.assertRaises(NoValidInterpretation, Regular_Expression, pattern)
+
+	def test_lazy_dfa(self):
+		re = Regular_Expression("(a|b)*a" + "(a|b)" * 30, alphabet = {"a", "b"})
+		self.assertTrue(re.test("b" * 10 + "a" + "b" * 30))
+		self.assertFalse(re.test("a" + "b" * 31))
+		self.assertLess(len(re.lazy_dfa), 100)
+		nfa = Regular_Expression("(a|b)*a(a|b)(a|b)(a|b)", alphabet = {"a", "b"}).nfa
+		dfa = nfa.convert()
+		lazy_dfa = Lazy_DFA(nfa, cache_size = 4, max_flushes = 2)
+		for n in range(64):
+			string = bin(n)[2:].replace("0", "b").replace("1", "a")
+			self.assertEqual(lazy_dfa.is_valid(string), dfa.is_valid(string), string)
+		self.assertGreater(lazy_dfa.flushes, 0)
+		self.assertFalse(lazy_dfa.is_valid("abc"))
+		self.assertTrue(nfa.is_valid("abbb"))
+		cached = nfa.lazy_dfa
+		self.assertFalse(nfa.is_valid("abbbb"))
+		self.assertIs(nfa.lazy_dfa, cached)
+		# Closing a join changes the states of the joined NFAs, whose cached DFAs must then be rebuilt
+		a = NFA({"a", "b"}, char_type = "a")
+		b = NFA({"a", "b"}, char_type = "b")
+		self.assertFalse(a.is_valid("ab"))
+		NFA.close_NFA(NFA.join_NFAs([a, b]))
+		self.assertTrue(Lazy_DFA(a).is_valid("ab"))
+		self.assertTrue(a.is_valid("ab"))
+
+	def test_re_cache(self):
+		cache = Pattern_Cache(size = 2)
+		re = cache.get("(ab)*c")
+		self.assertIs(cache.get("(ab)*c", {"a", "b", "c"}), re)
+		self.assertIsNot(cache.get("(ab)*c", {"a", "b", "c", "d"}), re)
+		self.assertEqual((cache.hits, cache.misses), (1, 2))
+		cache.get("a|b")
+		cache.get("b*")
+		self.assertEqual(len(cache), 2)
+		self.assertIs(cache.get("b*"), cache.get("b*"))
+		cache.resize(1)
+		self.assertEqual(len(cache), 1)
+		self.assertTrue(compile_pattern("(ab)*c").test("ababc"))
+		self.assertIs(compile_pattern("(ab)*c"), compile_pattern("(ab)*c"))
+
+	def test_cyk_index(self):
+		rc = Rule_Conversion(["<s> <s> + <s>", "<s> a"], [lambda args: "(" + args[0] + "+" + args[2] + ")", lambda a: a.name])
+		cfg = CFG(rc.get_converted_rules())
+		cfg.convert_rules_to_CNF()
+		parser = CFG_Parser(cfg)
+		self.assertEqual(sum(len(rules) for rules in parser.binary_rules.values()), len(cfg.complex_rules))
+		tokens = [Token(name = s, token_type = "terminal") for s in "a+a+a+a"]
+		values = {tree.unwind_tree().get_value() for tree in parser.parse(tokens)}
+		self.assertEqual(values, {"(a+(a+(a+a)))", "(a+((a+a)+a))", "((a+a)+(a+a))", "((a+(a+a))+a)", "(((a+a)+a)+a)"})
+		self.assertEqual(parser.parse(tokens[:2]), [])
+
+	def test_bitset_cyk(self):
+		lc = Lambda_Calculus()
+		for string in ["λx.x y (λz.z x) y", "f (g x) λy.y", "plus 2 (mul 3 4)"]:
+			tokens = list(lc.tokenize(string))
+			self.assertTrue(lc.parser.recognize(tokens))
+			tree = lc.parser.parse_one(tokens)
+			self.assertTrue(tree in lc.parser.parse(tokens))
+		self.assertFalse(lc.parser.recognize(list(lc.tokenize("(x"))))
+		self.assertEqual(lc.parser.parse_one(list(lc.tokenize("x ( y"))), None)
+
+	def test_parse_forest(self):
+		def plus(args):
+			return "(" + args[0] + "+" + args[2] + ")"
+		rc = Rule_Conversion(["<s> <s> + <s>", "<s> <s> * <s>", "<s> a"], [
+			plus,
+			lambda args: "(" + args[0] + "*" + args[2] + ")",
+			lambda a: a.name
+		])
+		cfg = CFG(rc.get_converted_rules())
+		cfg.convert_rules_to_CNF()
+		parser = CFG_Parser(cfg)
+		tokens = [Token(name = s, token_type = "terminal") for s in "a+a*a+a*a+a"]
+		forest = parser.parse_forest(tokens)
+		# The number of binary trees with 6 leaves is the Catalan number C_5
+		self.assertEqual(forest.count, 42)
+		trees = list(forest)
+		self.assertEqual(len(set(tree.unwind_tree().get_value() for tree in trees)), 42)
+		self.assertEqual(set(trees), set(parser.parse(tokens)))
+		self.assertEqual(forest.tree(41), trees[41])
+		self.assertFalse(parser.parse_forest(tokens[:2]))
+		# Preferring the rule for + at the root and throughout gives the usual precedence of * over +
+		def priority(rule):
+			return 0 if rule.evaluation is plus else 1
+		forest = parser.parse_forest(tokens, priority = priority)
+		self.assertEqual(forest.tree().unwind_tree().get_value(), "(a+((a*a)+((a*a)+a)))")
+		# Ordering the same nodes the other way in a second forest leaves the first one unchanged
+		reversed_forest = Parse_Forest(forest.root, priority = lambda rule: -priority(rule))
+		self.assertNotEqual(reversed_forest.tree(), forest.tree())
+		self.assertEqual(forest.tree().unwind_tree().get_value(), "(a+((a*a)+((a*a)+a)))")
+
+	def test_earley(self):
+		lc = Lambda_Calculus()
+		earley = Earley_Parser(lc.cfg)
+		for string in ["λx.x y (λz.z x) y", "f (g x) λy.y", "plus 2 (mul 3 4)", "(λx.x) y"]:
+			tokens = list(lc.tokenize(string))
+			self.assertTrue(earley.recognize(tokens))
+			expected = lc.parser.parse_one(tokens).unwind_tree().get_value()
+			self.assertEqual(repr(earley.parse_one(tokens).unwind_tree().get_value()), repr(expected))
+		self.assertEqual(earley.parse(list(lc.tokenize("x ( y"))), [])
+		parser = Regular_Expression.get_parser(Regular_Expression.default_alphabet)
+		earley = Earley_Parser(parser.cfg)
+		nfa = earley.parse_one([Token(name = s, token_type = "terminal") for s in "(a|bc)*c^"]).get_value()
+		for string in ["", "a", "bca", "abcc", "c", "ac"]:
+			self.assertEqual(nfa.is_valid(string), Regular_Expression("(a|bc)*c^").test(string))
+		rc = Rule_Conversion(["<s> a <s>"], [None])
+		empty_rule = Static_Rule(rc.get_translation()["<s>"], [])
+		self.assertRaises(InvalidRuleError, Earley_Parser, CFG(rc.get_converted_rules() + [empty_rule]))
+
+	def test_lalr(self):
+		lc = Lambda_Calculus()
+		self.assertEqual(lc.table_parser.conflicts, [])
+		# A name which is both a variable and a keyword matches two dynamic rules
+		lc.keywords["q"] = lc.keywords["true"]
+		lc.variables.add("q")
+		tokens = list(lc.tokenize("q"))
+		self.assertRaises(AmbiguousTokenError, lc.table_parser.parse_one, tokens)
+		self.assertEqual(len(lc.table_parser.conflicts), 1)
+		self.assertEqual(len(set(lc.parser.parse(tokens))), 2)
+		self.assertTrue(lc.parse("q") in [lc.keywords["true"], Variable(name = "q")])
+		lc = Lambda_Calculus()
+		analysis = lc.table_parser.analysis
+		self.assertEqual(analysis.follow[Token(name = "<exp>", token_type = "variable")], {Token(name = ")", token_type = "terminal"), None})
+		self.assertTrue(Token(name = "λ", token_type = "terminal") in analysis.first[Token(name = "<str>", token_type = "variable")])
+		# <str> -> <exp> and <str> -> <def> both begin with a variable
+		self.assertTrue(len(analysis.ll1_conflicts()) > 0)
+		for string in ["λx.x y (λz.z x) y", "f (g x) λy.y", "plus 2 (mul 3 4)", "(λx.x) y", "x"]:
+			tokens = list(lc.tokenize(string))
+			expected = lc.parser.parse_one(tokens).unwind_tree().get_value()
+			self.assertEqual(repr(lc.table_parser.parse_one(tokens).unwind_tree().get_value()), repr(expected))
+		self.assertFalse(lc.table_parser.recognize(list(lc.tokenize("x ( y"))))
+		self.assertRaises(InvalidParseStringError, lc.parse, "λx.")
+		# Concatenation of regular expressions is ambiguous
+		parser = Regular_Expression.get_parser(Regular_Expression.default_alphabet)
+		self.assertTrue(len(LALR_Parser(parser.cfg).conflicts) > 0)
+
+	def test_cnf_conversion(self):
+		rc = Rule_Conversion(["<s> <a>", "<a> <b>", "<b> <s> x", "<b> y", "<s> <c> z <c>", "<c> w", "<a> <b> y x y"], [None] * 7)
+		translation = rc.get_translation()
+		empty_rule = Static_Rule(translation["<c>"], [])
+		cfg = CFG(rc.get_converted_rules() + [empty_rule])
+		cfg.convert_rules_to_CNF()
+		self.assertFalse(any(rule.is_unit() or len(rule.rhs) == 0 for rule in cfg.rules))
+		self.assertTrue(all(len(rule.rhs) <= 2 for rule in cfg.rules))
+		# The split of <a> -> <b> y x y introduces the variables {yvxvyv} and {xvyv}
+		x, y = [Token(name = name, token_type = "variable") for name in ["xv", "yv"]]
+		self.assertTrue(cfg.exists([y, x, y]) != None and cfg.exists([x, y]) != None)
+		parser = CFG_Parser(cfg)
+		def recognize(string):
+			return parser.recognize([Token(name = s, token_type = "terminal") for s in string])
+		for string in ["y", "yx", "yxx", "z", "wzw", "zw", "zx", "yyxy"]:
+			self.assertTrue(recognize(string), string)
+		for string in ["x", "wwz", "yy"]:
+			self.assertFalse(recognize(string), string)
+		# Split rules keep their own old rules through "to_tuple", even if old rules share an evaluation
+		def join(args):
+			return args[0] + args[2]
+		rc = Rule_Conversion(["<s> <s> + <s>", "<s> <s> - <s>", "<s> a"], [join, join, lambda a: a.name])
+		cfg = CFG(rc.get_converted_rules())
+		cfg.convert_rules_to_CNF()
+		loaded = CFG(rc.get_converted_rules())
+		loaded.load_tuple(cfg.to_tuple())
+		def old_rules(cfg):
+			def names(rule):
+				return (rule.lhs.name, tuple(token.name for token in rule.rhs))
+			return {names(rule): names(rule.old_rule) for rule in cfg.rules if rule.old_rule != None}
+		self.assertEqual(len(old_rules(cfg)), 6)
+		self.assertEqual(old_rules(loaded), old_rules(cfg))
+
+	def test_incremental_parser(self):
+		lc = Lambda_Calculus()
+		incremental = Incremental_Parser(lc.parser)
+		strings = ["f (g x) λy.y", "f (g x) λy.y z", "h f (g x) λy.y z", "h f (g z) λy.y z", "h f (g z) λy.y z", "x", "(λx.x) y"]
+		for string in strings:
+			tokens = list(lc.tokenize(string))
+			self.assertEqual(set(incremental.parse(tokens)), set(lc.parser.parse(tokens)))
+		self.assertEqual(incremental.parse(list(lc.tokenize("x ( y"))), [])
+		# Moving the suffix leaves the spans of an earlier forest as they were
+		tokens = list(lc.tokenize("z b c"))
+		forest = incremental.parse_forest(tokens)
+		incremental.parse_forest(list(lc.tokenize("y y z b c")))
+		stack = [forest.root]
+		while len(stack) > 0:
+			node = stack.pop()
+			self.assertTrue(0 <= node.start <= node.end < len(tokens), (node.start, node.end))
+			if not node.is_leaf():
+				for _, left, right in node.packings:
+					self.assertEqual((left.start, right.end), (node.start, node.end))
+					stack.extend([left, right])
+		lc.table_parser = None
+		self.assertTrue(lc.parse("plus 1 2") == lc.parse("3"))
+		lc.parse("y := 2")
+		self.assertTrue(lc.parse("plus y 1") == lc.parse("3"))
+
+	def test_parallel_cyk(self):
+		lc = Lambda_Calculus()
+		parallel = CFG_Parser(lc.cfg, workers = 2, parallel_threshold = 5, parallel_work = 20)
+		for string in ["fix fac 3", "f (g x) (λy.y z) (plus 1 2) (λa.λb.b a) (h (k x) y) z", "x ( y"]:
+			tokens = list(lc.tokenize(string))
+			self.assertEqual(parallel.recognize(tokens), lc.parser.recognize(tokens))
+			self.assertEqual(repr(parallel.parse_one(tokens)), repr(lc.parser.parse_one(tokens)))
+
+	def test_startup_cache(self):
+		scanner = DFA.from_tuple(Lambda_Calculus.scanner.to_tuple())
+		source = "plus 12 (f x) := abc"
+		self.assertEqual([(m.string, m.token_type) for m in scanner.scan(source)], [(m.string, m.token_type) for m in Lambda_Calculus.scanner.scan(source)])
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "startup.cache")
+			cold = Lambda_Calculus(cache = Startup_Cache(path, "key"))
+			cache = Startup_Cache(path, "key")
+			self.assertTrue(cache.get("grammar") != None)
+			warm = Lambda_Calculus(cache = cache)
+			self.assertEqual(list(cold.keywords), list(warm.keywords))
+			self.assertEqual(cold.variables, warm.variables)
+			for string in ["fix fac 3", "mul 2 3", "and true false", "x := plus 1 1", "succ x"]:
+				self.assertEqual(repr(cold.parse(string)), repr(warm.parse(string)))
+			self.assertEqual(Startup_Cache(path, "other key").get("grammar"), None)
+
 	def test_lda(self):
 		lr = Lambda_Calculus()
 		self.assertTrue(lr.parse("succ (pow 2 3)") == lr.parse("pow 3 2"))
@@ -60,5 +356,135 @@ class NFA_Test(unittest.TestCase):
 		lr.parse("f := fix fac")
 		self.assertTrue(lr.parse("f 0") == lr.parse("1"))
 
+	def test_de_bruijn(self):
+		named = Lambda_Calculus()
+		de_bruijn = Lambda_Calculus(engine = "de bruijn")
+		self.assertTrue(named.parse("λx.x", simplify = False).to_de_bruijn() == named.parse("λy.y", simplify = False).to_de_bruijn())
+		self.assertFalse(named.parse("λx.λy.x", simplify = False).to_de_bruijn() == named.parse("λx.λy.y", simplify = False).to_de_bruijn())
+		for string in ["succ (pow 2 3)", "fix fac 3", "mul 3 4", "pred 0", "and true false", "(λx.λx.x) z", "λx.(λy.λx.y x) x"]:
+			self.assertTrue(de_bruijn.parse(string) == named.parse(string))
+		# The free variable y must not be captured
+		self.assertEqual(de_bruijn.parse("(λx.λy.x y) y").details(), "λa.ya")
+		self.assertEqual(repr(de_bruijn.parse("fac")), "fac")
+		de_bruijn.parse("f := fix fac")
+		self.assertTrue(de_bruijn.parse("f 0") == de_bruijn.parse("1"))
+		self.assertRaises(CannotSimplifyError, de_bruijn.parse, "(λx.x x) λx.x x")
+		self.assertRaises(ValueError, Lambda_Calculus, engine = "unknown")
+
+	def test_simplify_named(self):
+		lc = Lambda_Calculus()
+		for string in ["fix fac 3", "succ (pow 2 3)", "(λx.λy.x y) y", "ternary false ((λx.x x) λx.x x) o", "λy.(λx.x) ((λz.z) y)"]:
+			value = lc.parse(string, simplify = False)
+			steps = []
+			while value.can_be_simplified():
+				steps.append(value.details())
+				value = value.simplify_step()
+			output = io.StringIO()
+			with contextlib.redirect_stdout(output):
+				result = lc.parse(string, verbose = True)
+			self.assertEqual(result.details(), value.details())
+			self.assertEqual(output.getvalue(), "".join(step + "\n" for step in steps) + "\n")
+		self.assertRaises(CannotSimplifyError, lc.parse, "(λx.x x x) λx.x x x")
+
+	def test_interning(self):
+		lc = Lambda_Calculus()
+		x = Variable(name = "x")
+		self.assertTrue(Variable(name = "x") is x)
+		self.assertTrue(Application(x, x) is Application(x, x))
+		self.assertFalse(Application(x, x, alias = "xx") is Application(x, x))
+		self.assertTrue(lc.parse("3", simplify = False).body is lc.parse("3", simplify = False).body)
+		body = Application(x, Variable(name = "interning"))
+		self.assertTrue(Abstraction(x, body) == lc.parse("λy.y interning", simplify = False))
+		self.assertTrue(Lambda_Expression.interned.get(("l", id(x), id(body))) == None)
+		lc.parse("s := succ")
+		self.assertEqual(repr(lc.parse("succ")), "succ")
+		self.assertEqual(repr(lc.parse("s")), "s")
+		lc.parse("v := w")
+		keyword = Lambda_Expression.from_table(Lambda_Expression.to_table([lc.keywords["v"]]))[0]
+		self.assertEqual((repr(keyword), keyword.name), ("v", "w"))
+		self.assertEqual(repr(Variable(name = "w")), "w")
+
+	def test_graph_reduction(self):
+		named = Lambda_Calculus()
+		graph = Lambda_Calculus(engine = "graph")
+		for string in ["succ (pow 2 3)", "fix fac 3", "pred 3", "(λx.λy.x y) y", "ternary false ((λx.x x) λx.x x) o", "λf.λx.(λf.λx.f (f x)) (λg.λh.(h (g f))) (λu.x) λu.u"]:
+			self.assertTrue(graph.parse(string) == named.parse(string))
+		reducer = Graph_Reducer(1000)
+		reducer.reduce(named.parse("fix fac 3", simplify = False))
+		_, steps = named.parse("fix fac 3", simplify = False).to_de_bruijn().simplify(1000, 1000)
+		self.assertTrue(reducer.count < steps / 2)
+		self.assertEqual(repr(graph.parse("fac")), "fac")
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output):
+			graph.parse("(λx.x x) λy.y", verbose = True)
+		self.assertEqual(output.getvalue(), "(λx.xx)λy.y\n(λy.y)λy.y\n\n")
+		self.assertRaises(CannotSimplifyError, graph.parse, "(λx.x x) λx.x x")
+		for string in ["(λx.x y x) mul", "(λz.(λx.z z y) not) succ", "(λx.y (x x x) z (y y) y x) 2", "(λy.(λx.y y y) 0) 2"]:
+			self.assertTrue(graph.parse(string) == named.parse(string))
+
+	def test_engines_random(self):
+		lc = Lambda_Calculus()
+		rng = random.Random(1)
+		keywords = [lc.keywords[name] for name in ["succ", "pred", "plus", "mul", "true", "not", "iszero", "fac"]]
+		def random_expression(size):
+			if size <= 1:
+				return rng.choice(keywords) if rng.random() < 0.3 else Variable(name = rng.choice("xyz"))
+			elif rng.random() < 0.3:
+				return Abstraction(Variable(name = rng.choice("xyz")), random_expression(size - 1))
+			split = rng.randint(1, size - 1)
+			return Application(random_expression(split), random_expression(size - split))
+		compared = 0
+		for _ in range(500):
+			expression = random_expression(rng.randint(2, 12))
+			try:
+				expected, _ = expression.to_de_bruijn().simplify(500, 2000)
+			except (CannotSimplifyError, RecursionError):
+				continue
+			for engine in [Graph_Reducer, Krivine_Machine, Evaluator]:
+				self.assertTrue(engine(5000).reduce(expression) == expected, (engine.__name__, expression.details()))
+			compared += 1
+		self.assertTrue(compared > 300)
+
+	def test_krivine_machine(self):
+		named = Lambda_Calculus()
+		krivine = Lambda_Calculus(engine = "krivine")
+		for string in ["succ (pow 2 3)", "fix fac 3", "pred 3", "(λx.λy.x y) y", "ternary false ((λx.x x) λx.x x) o", "λx.(λy.λx.y x) x"]:
+			self.assertTrue(krivine.parse(string) == named.parse(string))
+		machine = Krivine_Machine(1000)
+		self.assertEqual(repr(machine.reduce(named.parse("mul 2 3", simplify = False)).to_named()), "6")
+		_, steps = named.parse("mul 2 3", simplify = False).to_de_bruijn().simplify(1000, 1000)
+		self.assertEqual(machine.count, steps)
+		self.assertEqual(repr(krivine.parse("fac")), "fac")
+		self.assertRaises(CannotSimplifyError, krivine.parse, "(λx.x x) λx.x x")
+
+	def test_evaluation(self):
+		named = Lambda_Calculus()
+		evaluation = Lambda_Calculus(engine = "evaluation")
+		for string in ["succ (pow 2 3)", "fix fac 3", "pred 3", "(λx.λy.x y) y", "ternary false ((λx.x x) λx.x x) o", "λx.(λy.λx.y x) x", "x (λy.y) z"]:
+			self.assertTrue(evaluation.parse(string) == named.parse(string))
+		self.assertEqual(repr(evaluation.parse("pow 3 4")), "81")
+		self.assertEqual(repr(evaluation.parse("fac")), "fac")
+		self.assertRaises(CannotSimplifyError, evaluation.parse, "(λx.x x) λx.x x")
+		self.assertRaises(CannotSimplifyError, evaluation.parse, "(λx.x x x) λx.x x x")
+
+	def test_native_numbers(self):
+		pure = Lambda_Calculus()
+		native = Lambda_Calculus(native_numbers = True)
+		strings = ["plus 2 3", "succ (succ 2)", "mul (plus 1 2) 4", "pow 2 3", "pred 0", "pred 5", "iszero 0", "iszero 3", "fix fac 3",
+			"3 2", "0 2", "2 f", "plus x 1", "2 succ 3", "plus 2", "mul 0 ((λx.x x) λx.x x)", "2 (λx.x x)", "and (iszero 1) true"]
+		for string in strings:
+			self.assertTrue(native.parse(string) == pure.parse(string))
+			self.assertEqual(repr(native.parse(string)), repr(pure.parse(string)))
+		self.assertTrue(isinstance(native.parse("3", simplify = False), Numeral))
+		self.assertTrue(native.parse("2") is native.parse("2"))
+		self.assertEqual(native.parse("2", simplify = False).details(), "λf.λx.f(fx)")
+		self.assertEqual(repr(native.parse("pow 2 9")), "512")
+		for string in ["pow 2 100", "pow 2 40 f", "pow 10 (pow 10 10)", "iszero (pow 10 (pow 10 10))"]:
+			self.assertRaises(CannotSimplifyError, native.parse, string)
+		native.parse("succ := λn.n")
+		self.assertEqual(repr(native.parse("succ 2")), "2")
+		keyword = Lambda_Expression.from_table(Lambda_Expression.to_table([native.keywords["fac"]]))[0]
+		self.assertTrue(keyword == native.keywords["fac"])
+
 if __name__ == "__main__":
 	unittest.main()
\ No newline at end of file
@@ -1,5 +1,66 @@
 from regular_expressions import *
-from sys import stdin, stdout
+from sys import stdin, stdout, modules
+from hashlib import sha256
+from functools import partial
+from weakref import ref
+import marshal
+import os
+
+class Startup_Cache:
+	"""Stores values built from tuples, strings, numbers and None (see "marshal") in the file "path", so that \
+	they need not be recomputed on every start.  The file is ignored unless it was written with the same "key", \
+	which should change whenever the code computing the values does; a file that cannot be read or written is \
+	treated like an empty cache."""
+	def __init__(self, path, key):
+		self.path = path
+		self.key = key
+		self.entries = {}
+		try:
+			with open(path, "rb") as cache_file:
+				key, entries = marshal.load(cache_file)
+			if key == self.key:
+				self.entries = entries
+		except (OSError, EOFError, ValueError, TypeError):
+			pass
+
+	def source_key(module_names):
+		"""Returns a key derived from the source code of the modules named in "module_names"."""
+		digest = sha256(b"startup cache 1")
+		for name in module_names:
+			with open(modules[name].__file__, "rb") as source:
+				digest.update(source.read())
+		return digest.hexdigest()
+
+	def get(self, name):
+		"""Returns the value stored under "name", or None if there is none."""
+		return self.entries.get(name)
+
+	def put(self, name, value):
+		"""Stores "value" under "name" and writes the cache file."""
+		self.entries[name] = value
+		temporary_path = self.path + "." + str(os.getpid())
+		try:
+			os.makedirs(os.path.dirname(self.path), exist_ok = True)
+			with open(temporary_path, "wb") as cache_file:
+				marshal.dump((self.key, self.entries), cache_file)
+			os.replace(temporary_path, self.path)
+		except OSError:
+			pass
+
+	def fetch(self, name, build, to_tuple, from_tuple):
+		"""Returns from_tuple(v) if the value v is stored under "name", and otherwise returns the result of \
+		build(), having stored its representation to_tuple(build())."""
+		data = self.get(name)
+		if data != None:
+			return from_tuple(data)
+		value = build()
+		self.put(name, to_tuple(value))
+		return value
+
+default_cache = Startup_Cache(
+	os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "untyped_lambda.cache"),
+	Startup_Cache.source_key(["finite_automata", "context_free_grammars", "regular_expressions", __name__])
+)
 
 class Lambda_Calculus:
 
@@ -49,22 +110,59 @@ class Lambda_Calculus:
 	alphabet = [chr(i) for i in range(ord("a"), ord("z")+1)]
 	digits = {str(i) for i in range(10)}
 	special_symbols = {"λ", "(", ")", ".", " ", ":="}
-	letter_nfas = [NFA({char}, char_type = char) for char in alphabet]
-	variable_names = NFA.close_NFA(NFA.join_NFAs(letter_nfas), new_token_type = "variable")
-	special_nfas = [NFA(set(char), char_type = char, token_type = "special symbol") for char in special_symbols]
-	digit_nfas = [NFA({digit}, char_type = digit) for digit in digits]
-	number_nfa = NFA.close_NFA(NFA.join_NFAs(digit_nfas), new_token_type = "number")
-	scanner = NFA.join_NFAs([variable_names] + special_nfas + digit_nfas).convert()
-
-	def __init__(self, recursion_limit = 1000, length_limit = 1000):
+
+	def build_scanner(alphabet, digits, special_symbols, minimize = True):
+		"""Returns the DFA of the scanner, which is minimized unless "minimize" is False."""
+		letter_nfas = [NFA({char}, char_type = char) for char in alphabet]
+		variable_names = NFA.close_NFA(NFA.join_NFAs(letter_nfas), new_token_type = "variable")
+		special_nfas = [NFA(set(char), char_type = char, token_type = "special symbol") for char in special_symbols]
+		digit_nfas = [NFA({digit}, char_type = digit) for digit in digits]
+		NFA.close_NFA(NFA.join_NFAs(digit_nfas), new_token_type = "number")
+		dfa = NFA.join_NFAs([variable_names] + special_nfas + digit_nfas).convert()
+		return dfa.minimize() if minimize else dfa
+
+	scanner = default_cache.fetch("scanner", partial(build_scanner, alphabet, digits, special_symbols), DFA.to_tuple, DFA.from_tuple)
+	table_scanner = scanner.compile()
+
+	# Keywords defined on start, as triples (keyword, definition, whether to simplify definition)
+	prelude = [
+		("succ", "λn.λf.λx.f (n f x)", True),
+		("pow", "λa.λb.b a", True),
+		("plus", "λm.λn.m succ n", True),
+		("mul", "λm.λn.λf.m (n f)", True),
+		("pred", "λn.λf.λx.n (λg.λh.(h (g f))) (λu.x) λu.u", True),
+		("true", "λx.λy.x", True),
+		("false", "λx.λy.y", True),
+		("and", "λp.λq.p q p", True),
+		("or", "λp.λq.p p q", True),
+		("not", "λp.p false true", True),
+		("ternary", "λp.λa.λb.(p a b)", True),
+		("iszero", "λn.n (λx.false) true", True),
+		("fac", "λf.λn.ternary (iszero n) 1 (mul n (f (pred n)))", True),
+		("fix", "λf.(λx.f (x x)) λx.f (x x)", False),
+	]
+
+	def __init__(self, recursion_limit = 1000, length_limit = 1000, cache = default_cache, engine = "named", native_numbers = False):
+		"""If "cache" is not None, the grammar in Chomsky normal form and the keywords of the prelude are \
+		loaded from the "Startup_Cache" "cache" when present there, and stored there otherwise.  "engine" is \
+		the key in "Lambda_Calculus.engines" of the method reducing expressions.  If "native_numbers", numbers \
+		are parsed as "Numeral"s, and the "named" engine computes the arithmetic keywords of the prelude on \
+		them directly (see "compute_arithmetic"); the other engines expand them."""
+		if engine not in Lambda_Calculus.engines:
+			raise ValueError("Unknown engine " + repr(engine))
 		self.recursion_limit = recursion_limit
 		self.length_limit = length_limit
+		self.engine = engine
+		self.native_numbers = native_numbers
 		self.variables = set()
 		self.keywords = {}
+		self.arithmetic = {}
 
 		rc = Rule_Conversion(Lambda_Calculus.rules, Lambda_Calculus.evaluations)
 
 		def evaluate_number(n):
+			if native_numbers:
+				return Numeral(int(n))
 			x = Variable(name = "x")
 			f = Variable(name = "f")
 			current_number = x
@@ -78,46 +176,108 @@ class Lambda_Calculus:
 		number_parsing = Dynamic_Rule(var_token, lambda n: evaluate_number(n.name), lambda prefix, suffix: prefix.token_type == "number")
 
 		self.cfg = CFG(rc.get_converted_rules() + [variable_conversion, keyword_parsing, number_parsing])
-		self.cfg.convert_rules_to_CNF()
+		grammar = None if cache == None else cache.get("grammar")
+		if grammar != None:
+			self.cfg.load_tuple(grammar)
+		else:
+			self.cfg.convert_rules_to_CNF()
+			if cache != None:
+				cache.put("grammar", self.cfg.to_tuple())
 		self.parser = CFG_Parser(self.cfg)
-		self.define("succ", "λn.λf.λx.f (n f x)")
-		self.define("pow", "λa.λb.b a")
-		self.define("plus", "λm.λn.m succ n")
-		self.define("mul", "λm.λn.λf.m (n f)")
-		self.define("pred", "λn.λf.λx.n (λg.λh.(h (g f))) (λu.x) λu.u")
-		self.define("true", "λx.λy.x")
-		self.define("false", "λx.λy.y")
-		self.define("and", "λp.λq.p q p")
-		self.define("or", "λp.λq.p p q")
-		self.define("not", "λp.p false true")
-		self.define("ternary", "λp.λa.λb.(p a b)")
-		self.define("iszero", "λn.n (λx.false) true")
-		self.define("fac", "λf.λn.ternary (iszero n) 1 (mul n (f (pred n)))")
-		self.define("fix", "λf.(λx.f (x x)) λx.f (x x)", simplify = False)
+		# Successive strings often differ little, so the general parser reuses what it can of its previous chart
+		self.incremental_parser = Incremental_Parser(self.parser)
+		# The grammar is LALR(1), so strings are parsed in linear time; the general parser remains as a fallback
+		self.table_parser = LALR_Parser(self.cfg)
+		if len(self.table_parser.conflicts) > 0:
+			for conflict in self.table_parser.conflicts:
+				print("Warning:", conflict)
+			self.table_parser = None
+		prelude_name = "prelude %d %d %s %s" % (recursion_limit, length_limit, engine, native_numbers)
+		prelude = None if cache == None else cache.get(prelude_name)
+		if prelude != None:
+			names, table, variables = prelude
+			self.keywords = dict(zip(names, Lambda_Expression.from_table(table)))
+			self.variables = set(variables)
+		else:
+			for name, string, simplify in Lambda_Calculus.prelude:
+				self.define(name, string, simplify = simplify)
+			if cache != None:
+				names = tuple(self.keywords)
+				table = Lambda_Expression.to_table([self.keywords[name] for name in names])
+				cache.put(prelude_name, (names, table, tuple(sorted(self.variables))))
+		if native_numbers:
+			self.prepare_arithmetic()
+
+	def prepare_arithmetic(self):
+		"""Fills "arithmetic", which maps the id of each arithmetic keyword of the prelude to the triple \
+		(keyword, number of arguments, function computing the result from the values of "Numeral"s).  The \
+		result is a term, the value of a numeral, or None if it would be too long.  The keywords are \
+		recognized by identity, so a keyword later redefined by the user is not affected."""
+		true = self.keywords["true"]
+		false = self.keywords["false"]
+		operations = [
+			("succ", 1, lambda n: n + 1),
+			("pred", 1, lambda n: max(n - 1, 0)),
+			("iszero", 1, lambda n: true if n == 0 else false),
+			("plus", 2, lambda m, n: m + n),
+			("mul", 2, lambda m, n: m * n),
+			("pow", 2, lambda a, b: Numeral.power(a, b, self.length_limit)),
+		]
+		for name, arity, operation in operations:
+			keyword = self.keywords[name]
+			self.arithmetic[id(keyword)] = (keyword, arity, operation)
+
+	def compute_arithmetic(self, term):
+		"""Returns the value of "term" if it is a "Numeral" or applies an arithmetic keyword to as many \
+		arguments as it takes, each of which has a value in turn, and None otherwise.  Since arithmetic on \
+		numerals always terminates, computing the arguments first yields the normal form reached by \
+		normal-order reduction.  A numeral too long for "length_limit" is not built, and None is returned so \
+		that ordinary reduction decides whether it is needed."""
+		if isinstance(term, Numeral):
+			return term
+		elif not isinstance(term, Application):
+			return None
+		entry = None
+		if isinstance(term.function, Application):
+			entry = self.arithmetic.get(id(term.function.function))
+			arguments = [term.function.argument, term.argument]
+		if entry == None or entry[1] != 2:
+			entry = self.arithmetic.get(id(term.function))
+			arguments = [term.argument]
+		if entry == None or entry[1] != len(arguments):
+			return None
+		values = []
+		for argument in arguments:
+			value = self.compute_arithmetic(argument)
+			if not isinstance(value, Numeral):
+				return None
+			values.append(value.value)
+		result = entry[2](*values)
+		if isinstance(result, int):
+			if result + 3 >= self.length_limit:
+				return None
+			result = Numeral(result)
+		return result
 
 	def parse(self, string, verbose = False, simplify = True):
-		tokens = []
-		for token in Lambda_Calculus.scanner.scan(string):
-			if token.string in self.keywords:
-				tokens.append(Token(name = token.string, token_type = "keyword"))
-			elif "number" in token.token_type:
-				tokens.append(Token(name = token.string, token_type = "number"))
-			elif "variable" in token.token_type:
-				if token.string in self.variables:
-					tokens.append(Token(name = token.string, token_type = "variable"))
-				else:
-					self.variables.add(token.string)
-					tokens.append(Token(name = token.string, token_type = "variable"))
-			else:
-				tokens.append(Token(name = token.string, token_type = "terminal"))
-		interpretations = self.parser.parse(tokens)
-		if len(interpretations) == 0:
-			raise InvalidParseStringError(string)
-		elif len(interpretations) > 1:
-			for i in interpretations:
-				print(i.unwind_tree())
-			print("Warning:", string, "has", len(interpretations), "interpretations; choosing one at random")
-		result = interpretations[0].unwind_tree().get_value()
+		tokens = list(self.tokenize(string))
+		tree = None
+		if self.table_parser != None:
+			try:
+				tree = self.table_parser.parse_one(tokens)
+				if tree == None:
+					raise InvalidParseStringError(string)
+			except AmbiguousTokenError:
+				# A token matches several dynamic rules; the general parser finds all the interpretations
+				pass
+		if tree == None:
+			interpretations = self.incremental_parser.parse_forest(tokens)
+			if interpretations.count == 0:
+				raise InvalidParseStringError(string)
+			elif interpretations.count > 1:
+				print("Warning:", string, "has", interpretations.count, "interpretations; choosing the first")
+			tree = interpretations.tree()
+		result = tree.unwind_tree().get_value()
 		if isinstance(result, Definition):
 			return result.define(self)
 		if simplify:
@@ -125,28 +285,166 @@ class Lambda_Calculus:
 		else:
 			return result
 
+	def tokenize(self, source):
+		"""Yields the "Token"s of "source", which is either a string or, for inputs too large to hold in
+		memory, a file object or iterable of string chunks."""
+		if isinstance(source, str):
+			matches = ((source[start:end], token_type) for start, end, token_type in Lambda_Calculus.table_scanner.scan(source))
+		else:
+			matches = ((match.string, match.token_type) for match in Lambda_Calculus.scanner.iter_scan(source))
+		for token_string, token_type in matches:
+			if token_string in self.keywords:
+				yield Token(name = token_string, token_type = "keyword")
+			elif "number" in token_type:
+				yield Token(name = token_string, token_type = "number")
+			elif "variable" in token_type:
+				self.variables.add(token_string)
+				yield Token(name = token_string, token_type = "variable")
+			else:
+				yield Token(name = token_string, token_type = "terminal")
+
 	def define(self, variable, string, simplify = True):
-		result = self.parse(string, simplify = simplify)
-		result.alias = variable
+		result = self.parse(string, simplify = simplify).with_alias(variable)
 		self.variables -= {variable}
 		self.keywords[variable] = result
+		self.incremental_parser.reset()
 
 	def simplify(self, value, verbose = False, limit = None):
-		count = 0
+		"""Returns the normal form of "value", raising "CannotSimplifyError" if it is not reached in "limit" \
+		(by default "recursion_limit") steps; if "verbose", the intermediate steps are printed."""
 		if limit == None:
 			limit = self.recursion_limit
+		return Lambda_Calculus.engines[self.engine](self, value, verbose, limit)
+
+	def simplify_named(self, value, verbose, limit):
+		"""Contracts the same redexes as repeated calls of "simplify_step" would, but keeps its place in the \
+		term: "path" lists the pairs (ancestor, "function", "argument" or "body") leading to "focus", and \
+		everything before "focus" in normal order is known to be in normal form.  After a contraction, only the \
+		parent of "focus" can have become a redex, so the search resumes at "focus".  Ancestors are rebuilt \
+		once, on the way back up, and subexpressions found to be in normal form are not searched again."""
+		path = []
+		focus = value
+		length = value.length
+		count = 0
 		intermediate_steps = ""
-		while value.can_be_simplified():
-			intermediate_steps += value.details() + "\n"
-			value = value.simplify_step()
-			count += 1
-			if count == limit or value.length >= self.length_limit:
-				raise CannotSimplifyError
+		normal = {}
+		while True:
+			result = None
+			if isinstance(focus, Application):
+				if len(self.arithmetic) > 0:
+					result = self.compute_arithmetic(focus)
+				if result is None and isinstance(focus.function, Numeral):
+					result = focus.function.evaluate(focus.argument, self.length_limit - length + focus.length)
+				elif result is None and isinstance(focus.function, Abstraction):
+					result = focus.function.evaluate(focus.argument)
+			if result is not None:
+				if verbose:
+					intermediate_steps += Lambda_Expression.zip_up(path, focus).details() + "\n"
+				length += result.length - focus.length
+				focus = result
+				count += 1
+				if count == limit or length >= self.length_limit:
+					raise CannotSimplifyError
+				if len(path) > 0 and path[-1][1] == "function" and isinstance(focus, Abstraction):
+					parent, _ = path.pop()
+					focus = Application(focus, parent.argument)
+			elif isinstance(focus, Variable) or isinstance(focus, Numeral) or id(focus) in normal:
+				# Everything in "focus" is in normal form, so the search continues after it
+				while len(path) > 0:
+					parent, slot = path.pop()
+					focus = parent.replace_child(slot, focus)
+					if slot == "function":
+						path.append((focus, "argument"))
+						focus = focus.argument
+						break
+					normal[id(focus)] = focus
+				else:
+					break
+			elif isinstance(focus, Application):
+				path.append((focus, "function"))
+				focus = focus.function
+			else:
+				path.append((focus, "body"))
+				focus = focus.body
 		if verbose:
 			print(intermediate_steps)
-		return value
-		
+		return focus
+
+	def simplify_de_bruijn(self, value, verbose, limit):
+		"""Reduces "value" as a "De_Bruijn_Term"; "value" itself is returned if it is in normal form, so that \
+		it keeps its alias."""
+		intermediate_steps = []
+		step = None
+		if verbose:
+			step = lambda term: intermediate_steps.append(term.to_named().details() + "\n")
+		term, count = value.to_de_bruijn().simplify(limit, self.length_limit, step)
+		if verbose:
+			print("".join(intermediate_steps))
+		if count == 0:
+			return value
+		return term.to_named()
+
+	def simplify_graph(self, value, verbose, limit):
+		"""Reduces "value" by graph reduction (see "Graph_Reducer"); "value" itself is returned if it is in \
+		normal form, so that it keeps its alias."""
+		reducer = Graph_Reducer(limit, verbose)
+		term = reducer.reduce(value)
+		if verbose:
+			print("".join(step + "\n" for step in reducer.steps))
+		if reducer.count == 0:
+			return value
+		if term.length >= self.length_limit:
+			raise CannotSimplifyError
+		return term.to_named()
+
+	def simplify_krivine(self, value, verbose, limit):
+		"""Reduces "value" with a "Krivine_Machine"; "value" itself is returned if it is in normal form, so \
+		that it keeps its alias.  If "verbose", the numbers of transitions and beta-reductions are printed."""
+		machine = Krivine_Machine(limit)
+		term = machine.reduce(value)
+		if verbose:
+			print(machine.transitions, "transitions,", machine.count, "beta-reductions\n")
+		if machine.count == 0:
+			return value
+		if term.length >= self.length_limit:
+			raise CannotSimplifyError
+		return term.to_named()
+
+	def simplify_by_evaluation(self, value, verbose, limit):
+		"""Reduces "value" by normalization by evaluation (see "Evaluator"); "value" itself is returned if it \
+		is in normal form, so that it keeps its alias.  If "verbose", the number of beta-reductions is printed."""
+		evaluator = Evaluator(limit)
+		term = evaluator.reduce(value)
+		if verbose:
+			print(evaluator.count, "beta-reductions\n")
+		if evaluator.count == 0:
+			return value
+		if term.length >= self.length_limit:
+			raise CannotSimplifyError
+		return term.to_named()
+
+	engines = {
+		"named": simplify_named,
+		"de bruijn": simplify_de_bruijn,
+		"graph": simplify_graph,
+		"krivine": simplify_krivine,
+		"evaluation": simplify_by_evaluation,
+	}
+
 class Lambda_Expression:
+	"""Expressions without an alias are interned: constructing an expression equal in structure to one that \
+	still exists, with the same children, returns the existing one, so identical subexpressions share a node and \
+	are compared by identity.  Since an interned expression may occur in many places, its alias must not be \
+	changed; "with_alias" returns a copy with a different alias instead."""
+	interned = None
+
+	def with_alias(self, alias):
+		"""Returns an expression with the same structure and children as this one, but with the alias "alias"."""
+		copy = object.__new__(type(self))
+		copy.__dict__.update(self.__dict__)
+		copy.alias = alias
+		return copy
+
 	def abstract(self, variable):
 		return Abstraction(variable, self)
 
@@ -157,11 +455,8 @@ class Lambda_Expression:
 		"""Returns False if expression does not represent number, and number it represents otherwise.""" 
 		return False
 
-	def __init__(self, alias):
-		self.alias = alias
-
 	def __eq__(self, other):
-		return self.is_equal(other, {})
+		return self is other or self.is_equal(other, {})
 
 	def __repr__(self):
 		number = self.is_number()
@@ -200,6 +495,101 @@ class Lambda_Expression:
 				description += token
 		return description
 
+	def to_table(expressions):
+		"""Returns a representation of the list "expressions" suitable for "marshal", which preserves the \
+		sharing of subexpressions.  Each subexpression appears once in the table, after its children, as \
+		("v", name, alias), ("n", value, alias) for a "Numeral", ("a", function, argument, alias) or \
+		("l", variable, body, alias), where children are given by their positions in the table.  The table is followed by the positions of "expressions"."""
+		numbering = {}
+		table = []
+		stack = [(expression, False) for expression in reversed(expressions)]
+		while len(stack) > 0:
+			term, children_done = stack.pop()
+			if id(term) in numbering:
+				continue
+			if isinstance(term, Variable):
+				table.append(("v", term.name, term.alias))
+			elif isinstance(term, Numeral):
+				table.append(("n", term.value, term.alias))
+			elif not children_done:
+				stack.append((term, True))
+				if isinstance(term, Application):
+					stack += [(term.argument, False), (term.function, False)]
+				else:
+					stack += [(term.body, False), (term.variable, False)]
+				continue
+			elif isinstance(term, Application):
+				table.append(("a", numbering[id(term.function)], numbering[id(term.argument)], term.alias))
+			else:
+				table.append(("l", numbering[id(term.variable)], numbering[id(term.body)], term.alias))
+			numbering[id(term)] = len(table) - 1
+		return (tuple(table), tuple(numbering[id(expression)] for expression in expressions))
+
+	def from_table(data):
+		"""Returns the list of expressions represented by "data" (see "to_table")."""
+		table, positions = data
+		terms = []
+		for entry in table:
+			if entry[0] == "v":
+				term = Variable(name = entry[1])
+				if term.alias != entry[2]:
+					term = term.with_alias(entry[2])
+			elif entry[0] == "n":
+				term = Numeral(entry[1])
+				if entry[2] != None:
+					term = term.with_alias(entry[2])
+			elif entry[0] == "a":
+				term = Application(terms[entry[1]], terms[entry[2]], alias = entry[3])
+			else:
+				term = Abstraction(terms[entry[1]], terms[entry[2]], alias = entry[3])
+			terms.append(term)
+		return [terms[position] for position in positions]
+
+	def to_de_bruijn(self, context = None, converted = None):
+		"""Returns the "De_Bruijn_Term" representing this expression, where "context" lists the names of the \
+		variables bound outside it, innermost last.  Aliases are kept, and subexpressions without free variables \
+		are converted once however often they occur."""
+		if context == None:
+			context = []
+		if converted == None:
+			converted = {}
+		if len(self.free_variables) == 0 and id(self) in converted:
+			return converted[id(self)]
+		if isinstance(self, Variable):
+			if self.name in context:
+				result = De_Bruijn_Variable(context[::-1].index(self.name), alias = self.alias)
+			else:
+				result = De_Bruijn_Variable(None, self.name, alias = self.alias)
+		elif isinstance(self, Application):
+			result = De_Bruijn_Application(self.function.to_de_bruijn(context, converted), self.argument.to_de_bruijn(context, converted), alias = self.alias)
+		else:
+			context.append(self.variable.name)
+			body = self.body.to_de_bruijn(context, converted)
+			context.pop()
+			result = De_Bruijn_Abstraction(body, self.variable.name, alias = self.alias)
+		if len(self.free_variables) == 0:
+			converted[id(self)] = result
+		return result
+
+	def replace_child(self, slot, child):
+		"""Returns this expression with its "slot" ("function", "argument" or "body") replaced by "child", or the \
+		expression itself if "child" is already there."""
+		if getattr(self, slot) is child:
+			return self
+		elif slot == "function":
+			return Application(child, self.argument)
+		elif slot == "argument":
+			return Application(self.function, child)
+		else:
+			return Abstraction(self.variable, child)
+
+	def zip_up(path, focus):
+		"""Returns the expression of which "focus" is the part reached by following "path" (see \
+		"Lambda_Calculus.simplify_named")."""
+		for parent, slot in reversed(path):
+			focus = parent.replace_child(slot, focus)
+		return focus
+
 	def ends_with_abstraction(self):
 		# If written recursively, this function may exceed Python's stack limits
 		term = self
@@ -213,17 +603,23 @@ class Lambda_Expression:
 
 class Variable(Lambda_Expression):
 	number = 1
-	def __init__(self, name = None, alias = None):
-		super().__init__(name)
+	def __new__(cls, name = None, alias = None):
+		existing = Lambda_Expression.interned.get(("v", name))
+		if existing is not None:
+			return existing
+		self = super().__new__(cls)
+		self.alias = name
 		if name == None:
 			self.name = "v_" + str(Variable.number)
 		else:
 			self.name = name
-		self.free_variables = {self.name}
-		self.variable_names = {self.name}
+		self.free_variables = frozenset([self.name])
+		self.variable_names = self.free_variables
 		self.length = 1
 		self.number = Variable.number
 		Variable.number += 1
+		Lambda_Expression.interned.add(("v", self.name), self)
+		return self
 
 	def substitute(self, replacer, replacee):
 		if self == replacee:
@@ -258,15 +654,26 @@ class Variable(Lambda_Expression):
 			return self.name == other.name
 
 class Application(Lambda_Expression):
-	def __init__(self, function, argument, alias = None):
-		super().__init__(alias)
+	def __new__(cls, function, argument, alias = None):
+		key = ("a", id(function), id(argument))
+		if alias == None:
+			existing = Lambda_Expression.interned.get(key)
+			if existing is not None:
+				return existing
+		self = super().__new__(cls)
+		self.alias = alias
 		self.function = function
 		self.argument = argument
-		self.free_variables = function.free_variables | argument.free_variables
-		self.variable_names = function.variable_names | argument.variable_names
+		self.free_variables = union(function.free_variables, argument.free_variables)
+		self.variable_names = union(function.variable_names, argument.variable_names)
 		self.length = function.length + argument.length
+		if alias == None:
+			Lambda_Expression.interned.add(key, self)
+		return self
 
 	def substitute(self, replacer, replacee):
+		if replacee.name not in self.free_variables:
+			return self
 		result = Application( self.function.substitute(replacer, replacee), self.argument.substitute(replacer, replacee) )
 		return result
 
@@ -291,18 +698,32 @@ class Application(Lambda_Expression):
 			raise CannotSimplifyError
 
 	def is_equal(self, other, translation):
+		if self is other and translation.keys().isdisjoint(self.free_variables):
+			return True
 		if not isinstance(other, Application):
 			return False
 		return self.function.is_equal(other.function, translation) and self.argument.is_equal(other.argument, translation)
 
 class Abstraction(Lambda_Expression):
-	def __init__(self, variable, body, alias = None):
-		super().__init__(alias)
+	def __new__(cls, variable, body, alias = None):
+		key = ("l", id(variable), id(body))
+		if alias == None:
+			existing = Lambda_Expression.interned.get(key)
+			if existing is not None:
+				return existing
+		self = super().__new__(cls)
+		self.alias = alias
 		self.variable = variable
 		self.body = body
-		self.free_variables = body.free_variables - {variable.name}
-		self.variable_names = body.variable_names | {variable.name}
+		if variable.name in body.free_variables:
+			self.free_variables = body.free_variables - variable.free_variables
+		else:
+			self.free_variables = body.free_variables
+		self.variable_names = union(body.variable_names, variable.variable_names)
 		self.length = body.length + 1
+		if alias == None:
+			Lambda_Expression.interned.add(key, self)
+		return self
 
 	def substitute(self, replacer, replacee):
 		if replacee.name not in self.free_variables:
@@ -339,6 +760,8 @@ class Abstraction(Lambda_Expression):
 		return Abstraction(self.variable, self.body.simplify_step())
 
 	def is_equal(self, other, translation):
+		if self is other and translation.keys().isdisjoint(self.free_variables):
+			return True
 		if not isinstance(other, Abstraction):
 			return False
 		if self.variable.name in translation:
@@ -349,6 +772,8 @@ class Abstraction(Lambda_Expression):
 		if self.variable == other.variable:
 			return self.body.is_equal(other.body, new_translation)
 		else:
+			# Copied, since "translation" is still needed for the rest of the caller's expression
+			new_translation = dict(new_translation)
 			new_translation[self.variable.name] = other.variable.name
 			return self.body.is_equal(other.body, new_translation)
 
@@ -373,6 +798,626 @@ class Abstraction(Lambda_Expression):
 	#	else:
 	#		return "λ" + str(self.variable) + "." + str(self.body)
 
+class Intern_Table:
+	"""Maps keys to expressions without keeping the expressions alive: the entry of an expression is removed \
+	when it is garbage collected.  This does the job of "weakref.WeakValueDictionary" with less overhead, as an \
+	expression is looked up and usually added every time one is constructed."""
+	def __init__(self):
+		self.references = {}
+
+	def __len__(self):
+		return len(self.references)
+
+	def get(self, key):
+		"""Returns the expression stored under "key", or None if there is none."""
+		reference = self.references.get(key)
+		if reference == None:
+			return None
+		return reference()
+
+	def add(self, key, expression):
+		reference = Intern_Reference(expression, self.forget)
+		reference.key = key
+		self.references[key] = reference
+
+	def forget(self, reference):
+		if self.references.get(reference.key) is reference:
+			del self.references[reference.key]
+
+class Intern_Reference(ref):
+	__slots__ = ("key",)
+
+Lambda_Expression.interned = Intern_Table()
+
+class Numeral(Abstraction):
+	"""The Church numeral λf.λx.f (f ... (f x)) with "value" applications of f, held as a number.  Its \
+	"variable" and "body" are only built when asked for, and applying it to an argument other than a numeral \
+	builds the result directly.  Its "length" is that of the expanded term, so that large numerals count \
+	against "length_limit"."""
+	def __new__(cls, value):
+		existing = Lambda_Expression.interned.get(("n", value))
+		if existing is not None:
+			return existing
+		self = object.__new__(cls)
+		self.alias = None
+		self.value = value
+		self.expansion = None
+		self.free_variables = frozenset()
+		self.variable_names = frozenset(["f", "x"])
+		self.length = value + 3
+		Lambda_Expression.interned.add(("n", value), self)
+		return self
+
+	@property
+	def variable(self):
+		return Variable(name = "f")
+
+	@property
+	def body(self):
+		if self.expansion == None:
+			x = Variable(name = "x")
+			self.expansion = Abstraction(x, Numeral.iterate(Variable(name = "f"), x, self.value))
+		return self.expansion
+
+	def iterate(function, argument, count):
+		"""Returns function (function ... (function argument)) with "count" applications."""
+		for _ in range(count):
+			argument = Application(function, argument)
+		return argument
+
+	def power(base, exponent, bound):
+		"""Returns base ** exponent, or None if it is larger than "bound" (None for no bound), without \
+		computing powers much larger than "bound"."""
+		if bound != None and base > 1 and exponent >= bound.bit_length():
+			return None
+		result = base ** exponent
+		if bound != None and result > bound:
+			return None
+		return result
+
+	def evaluate(self, argument, length_limit = None):
+		"""Returns the result of applying the numeral to "argument"; if "length_limit" is given, raises \
+		"CannotSimplifyError" instead of building a result that long."""
+		# n m reduces to the numeral for m ** n, except that 0 m reduces to λx.x
+		if isinstance(argument, Numeral):
+			if self.value == 0:
+				return Abstraction(Variable(name = "x"), Variable(name = "x"))
+			value = Numeral.power(argument.value, self.value, None if length_limit == None else length_limit - 4)
+			if value != None:
+				return Numeral(value)
+		if length_limit != None and self.value * (argument.length + 1) + 2 >= length_limit:
+			raise CannotSimplifyError
+		name = "x"
+		suffix = ""
+		while name in argument.free_variables:
+			for char in Lambda_Calculus.alphabet:
+				if char + suffix not in argument.free_variables:
+					name = char + suffix
+					break
+			else:
+				suffix += "'"
+		x = Variable(name = name)
+		return Abstraction(x, Numeral.iterate(argument, x, self.value))
+
+	def replace_variable(self, replacer, replacee):
+		return self
+
+	def can_be_simplified(self):
+		return False
+
+	def simplify_step(self):
+		return self
+
+	def is_number(self):
+		return self.value
+
+	def is_equal(self, other, translation):
+		if isinstance(other, Numeral):
+			return self.value == other.value
+		return super().is_equal(other, translation)
+
+def union(first, second):
+	"""Returns the union of the frozensets "first" and "second", which is one of them whenever possible, so that \
+	expressions share the sets of their subexpressions."""
+	if second <= first:
+		return first
+	elif first <= second:
+		return second
+	else:
+		return first | second
+
+class De_Bruijn_Term:
+	"""A lambda term in which a bound variable is the number of abstractions between it and the abstraction \
+	binding it, so that alpha-equivalent terms are equal and substitution need not rename bound variables.  \
+	"level" is one more than the largest index referring to an abstraction outside the term (0 if there is none), \
+	and "reducible" is whether the term contains a redex."""
+	def __init__(self, alias):
+		self.alias = alias
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __repr__(self):
+		return repr(self.to_named())
+
+	def simplify(self, limit, length_limit, step = None):
+		"""Returns the pair (normal form, number of steps) obtained by normal-order reduction, raising \
+		"CannotSimplifyError" if "limit" steps do not suffice or a term of length "length_limit" arises.  If \
+		"step" is not None, it is called with each term before that term is reduced."""
+		term = self
+		count = 0
+		while term.reducible:
+			if step != None:
+				step(term)
+			term = term.simplify_step()
+			count += 1
+			if count == limit or term.length >= length_limit:
+				raise CannotSimplifyError
+		return term, count
+
+	def to_named(self):
+		"""Returns the "Lambda_Expression" represented by this term.  Abstractions keep the names they had \
+		where possible, and are otherwise given the first name that neither captures a free variable nor hides \
+		a variable bound outside them which they contain."""
+		free_names = set()
+		self.collect_free_names(free_names)
+		return self.named(free_names, [])
+
+class De_Bruijn_Variable(De_Bruijn_Term):
+	"""A variable bound by the "index"-th enclosing abstraction, counting from 0, or, if "index" is None, the \
+	free variable "name"."""
+	def __init__(self, index, name = None, alias = None):
+		super().__init__(alias)
+		self.index = index
+		self.name = name
+		self.level = 0 if index == None else index + 1
+		self.length = 1
+		self.reducible = False
+
+	def __eq__(self, other):
+		return isinstance(other, De_Bruijn_Variable) and self.index == other.index and self.name == other.name
+
+	def shift(self, amount, cutoff):
+		if self.level <= cutoff:
+			return self
+		return De_Bruijn_Variable(self.index + amount)
+
+	def instantiate(self, argument, depth):
+		if self.level <= depth:
+			return self
+		elif self.index == depth:
+			return argument.shift(depth, 0)
+		else:
+			return De_Bruijn_Variable(self.index - 1)
+
+	def collect_free_names(self, names):
+		if self.index == None:
+			names.add(self.name)
+
+	def named(self, free_names, context):
+		if self.index == None:
+			return Variable(name = self.name)
+		return Variable(name = context[-1 - self.index])
+
+class De_Bruijn_Application(De_Bruijn_Term):
+	def __init__(self, function, argument, alias = None):
+		super().__init__(alias)
+		self.function = function
+		self.argument = argument
+		self.level = max(function.level, argument.level)
+		self.length = function.length + argument.length
+		self.reducible = isinstance(function, De_Bruijn_Abstraction) or function.reducible or argument.reducible
+
+	def __eq__(self, other):
+		return isinstance(other, De_Bruijn_Application) and self.function == other.function and self.argument == other.argument
+
+	def shift(self, amount, cutoff):
+		if self.level <= cutoff:
+			return self
+		return De_Bruijn_Application(self.function.shift(amount, cutoff), self.argument.shift(amount, cutoff))
+
+	def instantiate(self, argument, depth):
+		if self.level <= depth:
+			return self
+		return De_Bruijn_Application(self.function.instantiate(argument, depth), self.argument.instantiate(argument, depth))
+
+	def simplify_step(self):
+		if isinstance(self.function, De_Bruijn_Abstraction):
+			return self.function.body.instantiate(self.argument, 0)
+		elif self.function.reducible:
+			return De_Bruijn_Application(self.function.simplify_step(), self.argument)
+		else:
+			return De_Bruijn_Application(self.function, self.argument.simplify_step())
+
+	def collect_free_names(self, names):
+		self.function.collect_free_names(names)
+		self.argument.collect_free_names(names)
+
+	def named(self, free_names, context):
+		return Application(self.function.named(free_names, context), self.argument.named(free_names, context), alias = self.alias)
+
+class De_Bruijn_Abstraction(De_Bruijn_Term):
+	"""An abstraction whose bound variable was called "name"; the name only matters for "to_named"."""
+	def __init__(self, body, name = "x", alias = None):
+		super().__init__(alias)
+		self.body = body
+		self.name = name
+		self.level = max(body.level - 1, 0)
+		self.length = body.length + 1
+		self.reducible = body.reducible
+
+	def __eq__(self, other):
+		return isinstance(other, De_Bruijn_Abstraction) and self.body == other.body
+
+	def shift(self, amount, cutoff):
+		if self.level <= cutoff:
+			return self
+		return De_Bruijn_Abstraction(self.body.shift(amount, cutoff + 1), self.name)
+
+	def instantiate(self, argument, depth):
+		if self.level <= depth:
+			return self
+		return De_Bruijn_Abstraction(self.body.instantiate(argument, depth + 1), self.name)
+
+	def simplify_step(self):
+		return De_Bruijn_Abstraction(self.body.simplify_step(), self.name)
+
+	def collect_free_names(self, names):
+		self.body.collect_free_names(names)
+
+	def named(self, free_names, context):
+		# The body can only refer to the last body.level - 1 variables of "context"
+		visible = context[len(context) - self.body.level + 1:] if self.body.level > 1 else []
+		name = self.name
+		suffix = ""
+		while name in free_names or name in visible:
+			for char in Lambda_Calculus.alphabet:
+				if char + suffix not in free_names and char + suffix not in context:
+					name = char + suffix
+					break
+			else:
+				suffix += "'"
+		context.append(name)
+		body = self.body.named(free_names, context)
+		context.pop()
+		return Abstraction(Variable(name = name), body, alias = self.alias)
+
+class Graph_Node:
+	"""A node of the graph reduced by "Graph_Reducer", whose "kind" is "variable" (with a "name"), "application" \
+	(with a "function" and an "argument"), "abstraction" (with a "variable" node and a "body") or "indirection" \
+	(with a "target").  Every occurrence of a bound variable is the "variable" node of its abstraction, so that \
+	substitution replaces references rather than names.  "normal" is whether the subgraph is in normal form."""
+	def __init__(self, kind, name = None, function = None, argument = None, variable = None, body = None):
+		self.kind = kind
+		self.name = name
+		self.function = function
+		self.argument = argument
+		self.variable = variable
+		self.body = body
+		self.target = None
+		self.normal = False
+
+	def follow(self):
+		"""Returns the node this node refers to, following indirections."""
+		node = self
+		while node.kind == "indirection":
+			node = node.target
+		return node
+
+class Graph_Reducer:
+	"""Reduces expressions to normal form by graph reduction in the manner of Wadsworth.  A beta-reduction \
+	copies only the parts of the body of the abstraction containing its variable, so the argument is shared \
+	by all its occurrences, and the redex is overwritten with an indirection to the result, so whatever \
+	refers to it sees the result.  Each shared subgraph is therefore reduced at most once.  Reduction is to \
+	weak head normal form first and then inside the result, from left to right, which reaches the normal form \
+	whenever normal-order reduction does.  "count" is the number of beta-reductions performed; if "verbose", \
+	"steps" lists the term before each of them."""
+	def __init__(self, limit, verbose = False):
+		self.limit = limit
+		self.verbose = verbose
+		self.count = 0
+		self.steps = []
+		self.root = None
+
+	def reduce(self, expression):
+		"""Returns the normal form of "expression", a "Lambda_Expression", as a "De_Bruijn_Term", raising \
+		"CannotSimplifyError" if "limit" beta-reductions do not suffice or the graph is too deep for \
+		Python's recursion limit."""
+		try:
+			self.root = self.from_expression(expression, {}, {})
+			self.normalize(self.root)
+			return self.to_de_bruijn(self.root, [])
+		except RecursionError:
+			raise CannotSimplifyError
+
+	def from_expression(self, expression, bound, converted):
+		"""Returns the graph of "expression", where "bound" maps the names of the variables bound outside it to \
+		their nodes; subexpressions without free variables are converted once however often they occur."""
+		closed = len(expression.free_variables) == 0
+		if closed and id(expression) in converted:
+			return converted[id(expression)]
+		if isinstance(expression, Variable):
+			node = bound.get(expression.name)
+			if node == None:
+				node = Graph_Node("variable", name = expression.name)
+		elif isinstance(expression, Application):
+			node = Graph_Node("application", function = self.from_expression(expression.function, bound, converted),
+				argument = self.from_expression(expression.argument, bound, converted))
+		else:
+			variable = Graph_Node("variable", name = expression.variable.name)
+			inner = dict(bound)
+			inner[expression.variable.name] = variable
+			node = Graph_Node("abstraction", variable = variable, body = self.from_expression(expression.body, inner, converted))
+		if closed:
+			converted[id(expression)] = node
+		return node
+
+	def whnf(self, node):
+		"""Reduces "node" in place to weak head normal form, and returns the node it then refers to."""
+		spine = []
+		node = node.follow()
+		while True:
+			if node.kind == "application":
+				spine.append(node)
+				node = node.function.follow()
+			elif node.kind == "abstraction" and len(spine) > 0:
+				if self.verbose:
+					self.steps.append(self.to_de_bruijn(self.root, []).to_named().details())
+				self.count += 1
+				if self.count == self.limit:
+					raise CannotSimplifyError
+				redex = spine.pop()
+				result = self.instantiate(node.body, node.variable, redex.argument)
+				redex.kind = "indirection"
+				redex.target = result
+				redex.function = redex.argument = None
+				node = result.follow()
+			else:
+				return spine[0] if len(spine) > 0 else node
+
+	def instantiate(self, body, variable, argument):
+		"""Returns the graph of "body" with the node "variable" replaced by "argument".  Only the subgraphs \
+		in which "variable" or a variable bound within "body" occurs free are copied, the others being shared, \
+		and every abstraction copied gets a new variable node, so that each variable node stays bound by \
+		exactly one abstraction."""
+		# Every path to an occurrence of a variable passes through its abstraction, so "local" holds the
+		# variables bound within "body" by the time their occurrences are reached
+		local = {id(variable)}
+		free = {}
+		def mark(node):
+			"""Returns the set of ids of the variables of "local" occurring free in "node"."""
+			node = node.follow()
+			if id(node) in free:
+				return free[id(node)]
+			if node.kind == "variable":
+				return frozenset([id(node)]) if id(node) in local else frozenset()
+			elif node.kind == "application":
+				result = union(mark(node.function), mark(node.argument))
+			else:
+				local.add(id(node.variable))
+				result = mark(node.body)
+				if id(node.variable) in result:
+					result = result - {id(node.variable)}
+			free[id(node)] = result
+			return result
+		mark(body)
+		replacements = {id(variable): argument}
+		copies = {}
+		def copy(node):
+			node = node.follow()
+			if node.kind == "variable":
+				return replacements.get(id(node), node)
+			elif len(free[id(node)]) == 0:
+				return node
+			elif id(node) in copies:
+				return copies[id(node)]
+			if node.kind == "application":
+				result = Graph_Node("application", function = copy(node.function), argument = copy(node.argument))
+			else:
+				new_variable = Graph_Node("variable", name = node.variable.name)
+				replacements[id(node.variable)] = new_variable
+				result = Graph_Node("abstraction", variable = new_variable, body = copy(node.body))
+			copies[id(node)] = result
+			return result
+		return copy(body)
+
+	def normalize(self, node):
+		"""Reduces "node" in place to normal form."""
+		node = self.whnf(node)
+		if node.normal:
+			return
+		if node.kind == "abstraction":
+			self.normalize(node.body)
+		elif node.kind == "application":
+			self.normalize(node.function)
+			self.normalize(node.argument)
+		node.normal = True
+
+	def to_de_bruijn(self, node, context):
+		"""Returns the "De_Bruijn_Term" represented by "node", where "context" lists the variable nodes of the \
+		abstractions enclosing it, innermost last."""
+		node = node.follow()
+		if node.kind == "variable":
+			for index in range(len(context)):
+				if context[-1 - index] is node:
+					return De_Bruijn_Variable(index)
+			return De_Bruijn_Variable(None, node.name)
+		elif node.kind == "application":
+			return De_Bruijn_Application(self.to_de_bruijn(node.function, context), self.to_de_bruijn(node.argument, context))
+		else:
+			context.append(node.variable)
+			body = self.to_de_bruijn(node.body, context)
+			context.pop()
+			return De_Bruijn_Abstraction(body, node.variable.name)
+
+class Krivine_Machine:
+	"""Evaluates "De_Bruijn_Term"s to weak head normal form by call-by-name, without rewriting them.  A closure \
+	is a pair (term, environment), an environment is None or a pair (closure, environment) whose first closure \
+	is the value of index 0, and the stack holds the closures of the pending arguments, the first on top.  To \
+	read back the normal form, the variable of an abstraction is bound to a closure (k, None), where k is the \
+	number of abstractions outside it, and the body is evaluated in turn.  "count" is the number of \
+	beta-reductions and "transitions" the number of steps of the machine."""
+	def __init__(self, limit):
+		self.limit = limit
+		self.count = 0
+		self.transitions = 0
+
+	def reduce(self, expression):
+		"""Returns the normal form of "expression", a "Lambda_Expression", as a "De_Bruijn_Term", raising \
+		"CannotSimplifyError" if "limit" beta-reductions do not suffice."""
+		return self.read_back(expression.to_de_bruijn(), None, 0)
+
+	def evaluate(self, term, environment):
+		"""Returns the triple (term, environment, stack) reached by running the machine from the closure \
+		(term, environment) with an empty stack, where the term is an abstraction and the stack is empty, or \
+		the term is a free variable or a bound variable number (see "read_back")."""
+		stack = []
+		while True:
+			self.transitions += 1
+			if isinstance(term, De_Bruijn_Application):
+				stack.append((term.argument, environment))
+				term = term.function
+			elif isinstance(term, De_Bruijn_Abstraction):
+				if len(stack) == 0:
+					return term, environment, stack
+				self.count += 1
+				if self.count == self.limit:
+					raise CannotSimplifyError
+				environment = (stack.pop(), environment)
+				term = term.body
+			elif isinstance(term, De_Bruijn_Variable) and term.index != None:
+				for _ in range(term.index):
+					environment = environment[1]
+				term, environment = environment[0]
+			else:
+				return term, environment, stack
+
+	def read_back(self, term, environment, depth):
+		"""Returns the normal form of the closure (term, environment), as a "De_Bruijn_Term" under "depth" \
+		abstractions."""
+		term, environment, stack = self.evaluate(term, environment)
+		if isinstance(term, De_Bruijn_Abstraction):
+			body = self.read_back(term.body, ((depth, None), environment), depth + 1)
+			return De_Bruijn_Abstraction(body, term.name)
+		if isinstance(term, int):
+			result = De_Bruijn_Variable(depth - 1 - term)
+		else:
+			result = term
+		while len(stack) > 0:
+			argument, argument_environment = stack.pop()
+			result = De_Bruijn_Application(result, self.read_back(argument, argument_environment, depth))
+		return result
+
+class Thunk:
+	"""The value of running "code" on "environment", computed when first needed and then remembered."""
+	def __init__(self, code, environment):
+		self.code = code
+		self.environment = environment
+		self.value = None
+
+	def force(self):
+		if self.code != None:
+			self.value = self.code(self.environment)
+			self.code = self.environment = None
+		return self.value
+
+	def evaluated(value):
+		"""Returns a "Thunk" whose value is "value"."""
+		thunk = Thunk(None, None)
+		thunk.value = value
+		return thunk
+
+class Function_Value:
+	"""The value of an abstraction: "function" maps the "Thunk" of an argument to the value of the body."""
+	def __init__(self, function, name):
+		self.function = function
+		self.name = name
+
+class Neutral_Value:
+	"""The value of a variable applied to the "Thunk"s "arguments", which cannot be reduced further.  "head" \
+	is the name of a free variable, or, for a variable bound during "Evaluator.reify", the number of \
+	abstractions outside its own."""
+	def __init__(self, head, arguments):
+		self.head = head
+		self.arguments = arguments
+
+class Evaluator:
+	"""Normalizes expressions by evaluation: a "De_Bruijn_Term" is compiled into a Python function from \
+	environments to values, abstractions becoming Python closures, and the value is converted back into a term \
+	by "reify".  An environment is None or a pair (thunk, environment) whose first thunk is the value of index \
+	0.  Arguments are passed as "Thunk"s, so they are evaluated only when needed and then at most once, and \
+	evaluation terminates whenever normal-order reduction does.  "count" is the number of beta-reductions; \
+	"CannotSimplifyError" is raised once it reaches "limit" or Python's recursion limit is reached."""
+	def __init__(self, limit):
+		self.limit = limit
+		self.count = 0
+
+	def reduce(self, expression):
+		"""Returns the normal form of "expression", a "Lambda_Expression", as a "De_Bruijn_Term"."""
+		try:
+			return self.reify(self.compile(expression.to_de_bruijn(), {})(None), 0)
+		except RecursionError:
+			raise CannotSimplifyError
+
+	def apply(self, function, thunk):
+		if isinstance(function, Function_Value):
+			self.count += 1
+			if self.count == self.limit:
+				raise CannotSimplifyError
+			return function.function(thunk)
+		return Neutral_Value(function.head, function.arguments + (thunk,))
+
+	def compile(self, term, compiled):
+		"""Returns a function mapping environments to the value of "term"; "compiled" maps the ids of terms \
+		already compiled to their functions."""
+		if id(term) in compiled:
+			return compiled[id(term)]
+		if isinstance(term, De_Bruijn_Variable):
+			if term.index == None:
+				value = Neutral_Value(term.name, ())
+				code = lambda environment: value
+			else:
+				thunk = self.compile_thunk(term, compiled)
+				code = lambda environment: thunk(environment).force()
+		elif isinstance(term, De_Bruijn_Application):
+			function = self.compile(term.function, compiled)
+			argument = self.compile_thunk(term.argument, compiled)
+			apply = self.apply
+			code = lambda environment: apply(function(environment), argument(environment))
+		else:
+			body = self.compile(term.body, compiled)
+			name = term.name
+			code = lambda environment: Function_Value(lambda thunk: body((thunk, environment)), name)
+		compiled[id(term)] = code
+		return code
+
+	def compile_thunk(self, term, compiled):
+		"""Returns a function mapping environments to a "Thunk" of the value of "term"."""
+		if isinstance(term, De_Bruijn_Variable) and term.index != None:
+			index = term.index
+			if index == 0:
+				return lambda environment: environment[0]
+			def lookup(environment):
+				for _ in range(index):
+					environment = environment[1]
+				return environment[0]
+			return lookup
+		code = self.compile(term, compiled)
+		return lambda environment: Thunk(code, environment)
+
+	def reify(self, value, depth):
+		"""Returns the "De_Bruijn_Term" in normal form whose value is "value", under "depth" abstractions."""
+		if isinstance(value, Function_Value):
+			body = value.function(Thunk.evaluated(Neutral_Value(depth, ())))
+			return De_Bruijn_Abstraction(self.reify(body, depth + 1), value.name)
+		if isinstance(value.head, int):
+			term = De_Bruijn_Variable(depth - 1 - value.head)
+		else:
+			term = De_Bruijn_Variable(None, value.head)
+		for thunk in value.arguments:
+			term = De_Bruijn_Application(term, self.reify(thunk.force(), depth))
+		return term
+
 class Definition:
 	def __init__(self, variable, expression):
 		self.name = variable.alias
@@ -384,8 +1429,9 @@ class Definition:
 			result = context.simplify(self.expression, limit = 100)
 		except CannotSimplifyError:
 			result = self.expression
-		result.alias = self.name
+		result = result.with_alias(self.name)
 		context.keywords[self.name] = result
+		context.incremental_parser.reset()
 		return result
 
 class InvalidParseStringError(Exception):